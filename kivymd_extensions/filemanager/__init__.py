@@ -9,3 +9,7 @@ Factory.register(
     "CustomFileChooserIcon",
     module="kivymd_extensions.filemanager.file_chooser_icon",
 )
+Factory.register(
+    "FileChooserTree",
+    module="kivymd_extensions.filemanager.file_chooser_tree",
+)
@@ -1,39 +1,74 @@
-import os
+from functools import partial
+from os.path import (
+    abspath,
+    basename,
+    dirname,
+    expanduser,
+    isfile,
+    join,
+    normpath,
+    realpath,
+    sep,
+    splitdrive,
+)
+from weakref import ref
 
 from kivy.lang import Builder
+from kivy.logger import Logger
 from kivy.metrics import dp
 from kivy.properties import (
+    BooleanProperty,
     NumericProperty,
     StringProperty,
     ListProperty,
     ObjectProperty,
+    OptionProperty,
 )
-from kivy.uix.filechooser import FileChooserController
-from kivy.utils import QueryDict
+from kivy.clock import Clock
+from kivy.uix.boxlayout import BoxLayout
+from kivy.uix.filechooser import FileChooserController, filesize_units
+from kivy.uix.recycleview.views import RecycleDataViewBehavior
+from kivy.utils import QueryDict, platform
+
+from kivymd.uix.tooltip import MDTooltip
+
+from kivymd_extensions.filemanager.libs.filetype import needs_sniffing
+from kivymd_extensions.filemanager.libs.listing import get_path_record
+from kivymd_extensions.filemanager.libs.sorting import (
+    SORT_ORDERS,
+    ListingSorter,
+    find_position,
+)
+from kivymd_extensions.filemanager.libs.tasks import BackgroundTask
+from kivymd_extensions.filemanager.libs.thumbnails import is_image
+
+# Number of entries delivered to the grid at once while a directory is
+# loaded.
+LOAD_CHUNK_SIZE = 500
+# Time in seconds after which the progress of a load is shown.
+LOAD_PROGRESS_DELAY = 0.3
 
 Builder.load_string(
     """
-[FileThumbEntry@BoxLayout+MDTooltip]:
+<FileThumbEntry>
     orientation: "vertical"
     spacing: "4dp"
     image: image
-    locked: False
-    path: ctx.path
-    selected: self.path in ctx.controller().selection
+    selected: self.path in self.controller.selection if self.controller else False
     size_hint: None, None
     on_touch_down:
         root.entry_released_allow = True
         if self.collide_point(*args[1].pos): \
-        ctx.controller().manager.tap_on_file_dir(args, "FileChooserIcon")
+        root.controller.manager.tap_on_file_dir(args, "FileChooserIcon")
     on_touch_up:
-        if not ctx.controller().manager.context_menu_open: self.collide_point(*args[1].pos) \
-        and ctx.controller().entry_released(self, args[1]) and root.entry_released_allow
-    size: ctx.controller().thumbsize + dp(52), ctx.controller().thumbsize + dp(52)
+        if not root.controller.manager.context_menu_open: self.collide_point(*args[1].pos) \
+        and root.controller.entry_released(self, args[1]) and root.entry_released_allow
+    size: root.thumbsize + dp(52), root.thumbsize + dp(52)
     tooltip_display_delay: 1.5
     on_enter:
-        self.tooltip_text = ctx.name if ctx.controller().manager.config.getint("General", "tooltip") \
-        and not ctx.controller().manager.settings_panel_open and not ctx.controller().manager.dialog_plugin_open \
-        and not ctx.controller().manager.dialog_files_search_results_open else ""
+        self.tooltip_text = root.name if root.controller.manager.config.getint("General", "tooltip") \
+        and not root.controller.manager.settings_panel_open and not root.controller.manager.dialog_plugin_open \
+        and not root.controller.manager.dialog_files_search_results_open else ""
 
     canvas:
         Color:
@@ -44,73 +79,239 @@ Builder.load_string(
             size: root.size
             source: "atlas://data/images/defaulttheme/filechooser_selected"
 
-    MDIconButton:
-        id: image
-        user_font_size:
-            sp(int(ctx.controller().thumbsize)) \
-            if self.icon == "folder" else sp(int(ctx.controller().thumbsize / 2))
-        theme_text_color: "Custom"
-        pos_hint: {"center_x": .5}
-        md_bg_color_disabled: 0, 0, 0, 0
-        text_color:
-            app.theme_cls.primary_color if self.icon == "folder" \
-            else app.theme_cls.disabled_hint_text_color
-        disabled: True if self.icon != "folder" else False
+    RelativeLayout:
+        size_hint_y: None
+        height: max(image.height, root.thumbsize)
+
+        MDIconButton:
+            id: image
+            icon: root.icon
+            user_font_size:
+                sp(int(root.thumbsize)) \
+                if self.icon == "folder" else sp(int(root.thumbsize / 2))
+            theme_text_color: "Custom"
+            pos_hint: {"center_x": .5, "center_y": .5}
+            opacity: 0 if root.thumbnail else 1
+            md_bg_color_disabled: 0, 0, 0, 0
+            text_color:
+                app.theme_cls.primary_color if self.icon == "folder" \
+                else app.theme_cls.disabled_hint_text_color
+            disabled: True if self.icon != "folder" else False
+
+        Image:
+            texture: root.thumbnail
+            opacity: 1 if root.thumbnail else 0
+            size_hint: None, None
+            size: root.thumbsize, self.parent.height
+            pos_hint: {"center_x": .5, "center_y": .5}
+            allow_stretch: True
 
     MDLabel:
-        text: ctx.name
+        text: root.name
         size_hint: None, None
-        -text_size: (ctx.controller().thumbsize, self.height)
+        -text_size: (root.thumbsize, self.height)
         halign: "center"
         shorten: True
-        size: ctx.controller().thumbsize, "16dp"
+        size: root.thumbsize, "16dp"
         pos_hint: {"center_x": .5}
-        color: ctx.controller().text_color
+        color: root.text_color
         font_style: "Caption"
 
     MDLabel:
-        text: ctx.controller()._gen_label(ctx)
+        text: root.size_text
         font_style: "Caption"
         color: .8, .8, .8, 1
         size_hint: None, None
         -text_size: None, None
-        size: ctx.controller().thumbsize, "16sp"
+        size: root.thumbsize, "16sp"
         pos_hint: {"center_x": .5}
         halign: "center"
-        color: ctx.controller().text_color
+        color: root.text_color
 
     Widget:
 
 
 <CustomFileChooserIcon>:
-    on_entry_added: stack.add_widget(args[1])
-    on_entries_cleared: stack.clear_widgets()
-    _scrollview: scrollview
+    _scrollview: rv
 
-    ScrollView:
-        id: scrollview
+    RecycleView:
+        id: rv
+        viewclass: "FileThumbEntry"
         do_scroll_x: False
 
-        Scatter:
-            do_rotation: False
-            do_scale: False
-            do_translation: False
+        RecycleGridLayout:
+            cols:
+                max(1, int((self.width - dp(10)) \
+                / (root.thumbsize + dp(52) + dp(10))))
+            default_size: root.thumbsize + dp(52), root.thumbsize + dp(52)
+            default_size_hint: None, None
             size_hint_y: None
-            height: stack.height
-
-            StackLayout:
-                id: stack
-                width: scrollview.width
-                size_hint_y: None
-                height: self.minimum_height
-                spacing: "10dp"
-                padding: "10dp"
+            height: self.minimum_height
+            spacing: "10dp"
+            padding: "10dp"
 """
 )
 
 
+class FileThumbEntry(RecycleDataViewBehavior, MDTooltip, BoxLayout):
+    """
+    Cell of the grid of files. The cells are created only for the visible
+    entries and are reused while scrolling.
+    """
+
+    path = StringProperty()
+    name = StringProperty()
+    icon = StringProperty()
+    isdir = BooleanProperty(False)
+    selected = BooleanProperty(False)
+
+    size_text = StringProperty()
+    """
+    Size of the file, it is only computed when the entry is displayed.
+    """
+
+    controller = ObjectProperty()
+    """
+    :class:`CustomFileChooserIcon` object.
+    """
+
+    thumbsize = NumericProperty(dp(72))
+    text_color = ListProperty([1, 1, 1, 1])
+
+    entry_released_allow = BooleanProperty(False)
+
+    thumbnail = ObjectProperty(None, allownone=True)
+    """
+    Texture of the thumbnail of an image, it is only requested while the
+    entry is displayed.
+    """
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        # <kivymd_extensions.filemanager.libs.thumbnails.ThumbnailRequest
+        # object> of the thumbnail that is being made.
+        self._thumbnail_request = None
+        # <concurrent.futures.Future object> of the detection of the type of
+        # the file.
+        self._type_request = None
+        # <concurrent.futures.Future object> of the count of the entries of
+        # the directory.
+        self._count_request = None
+        # Data of the displayed entry, it is replaced when the file changes.
+        self._data = None
+
+    def refresh_view_attrs(self, rv, index, data):
+        if data is not self._data:
+            self._data = data
+            self.cancel_thumbnail()
+            self.cancel_file_type()
+            self.cancel_item_count()
+            self.thumbnail = None
+        self.controller = data["controller"]
+        self.thumbsize = self.controller.thumbsize
+        self.text_color = self.controller.text_color or [1, 1, 1, 1]
+        self.path = data["path"]
+        self.name = data["name"]
+        self.icon = data["icon"]
+        self.isdir = data["isdir"]
+        self.size_text = self.controller._gen_label(data)
+        self.request_thumbnail()
+        self.request_file_type()
+        self.request_item_count()
+
+    def request_thumbnail(self):
+        if self.thumbnail or self._thumbnail_request or self.isdir:
+            return
+        if self.controller:
+            self._thumbnail_request = self.controller.request_thumbnail(
+                self.path, self._on_thumbnail
+            )
+
+    def cancel_thumbnail(self):
+        if self._thumbnail_request:
+            self._thumbnail_request.cancel()
+            self._thumbnail_request = None
+
+    def request_file_type(self):
+        # The type of the file is detected once, the icon of the detected
+        # type is kept in the data of the entry.
+        if self._type_request or self.isdir or not self._data:
+            return
+        if "file_type" in self._data:
+            return
+        if self.controller:
+            self._type_request = self.controller.request_file_type(
+                self.path, partial(self._on_file_type, self._data)
+            )
+
+    def cancel_file_type(self):
+        if self._type_request:
+            self._type_request.cancel()
+            self._type_request = None
+
+    def request_item_count(self):
+        if self._count_request or not self.isdir or not self._data:
+            return
+        if "item_count" in self._data:
+            return
+        if self.controller:
+            self._count_request = self.controller.request_item_count(
+                self.path, partial(self._on_item_count, self._data)
+            )
+
+    def cancel_item_count(self):
+        if self._count_request:
+            self._count_request.cancel()
+            self._count_request = None
+
+    def on_parent(self, instance, parent):
+        # The grid removes the cells that are scrolled out of view.
+        if parent is None:
+            self.cancel_thumbnail()
+            self.cancel_file_type()
+            self.cancel_item_count()
+        else:
+            self.request_thumbnail()
+            self.request_file_type()
+            self.request_item_count()
+
+    def _on_thumbnail(self, texture):
+        self._thumbnail_request = None
+        self.thumbnail = texture
+
+    def _on_file_type(self, data, extension):
+        data["file_type"] = extension
+        if extension:
+            data["icon"] = self.controller.get_icon_file(
+                data["path"], extension=extension
+            )
+        if data is self._data:
+            self._type_request = None
+            self.icon = data["icon"]
+
+    def _on_item_count(self, data, count):
+        data["item_count"] = count
+        if data is self._data:
+            self._count_request = None
+            self.size_text = self.controller._gen_label(data)
+
+
+class _EntryKeys:
+    # The sort keys of the entries of the data of the grid, for searching
+    # the data with `find_position` without copying it.
+
+    def __init__(self, data, keys):
+        self.data = data
+        self.keys = keys
+
+    def __len__(self):
+        return len(self.data)
+
+    def __getitem__(self, index):
+        return self.keys[self.data[index]["name"]]
+
+
 class CustomFileChooserIcon(FileChooserController):
-    _ENTRY_TEMPLATE = "FileThumbEntry"
 
     thumbsize = NumericProperty(dp(72))
     """
@@ -138,7 +339,8 @@ class CustomFileChooserIcon(FileChooserController):
 
     get_icon_file = ObjectProperty()
     """
-    Method that returns the icon path for the file.
+    Method that returns the icon path for the file. For files whose type is
+    detected by contents, it is also given the `extension` of the type.
 
     :attr:`get_icon_file` is an :class:`~kivy.properties.ObjectProperty`
     and defaults to `None`.
@@ -152,9 +354,230 @@ class CustomFileChooserIcon(FileChooserController):
     and defaults to `None`.
     """
 
+    sort_by = OptionProperty("name", options=SORT_ORDERS)
+    """
+    Order of the entries, one of
+    :data:`~kivymd_extensions.filemanager.libs.sorting.SORT_ORDERS`.
+    Directories are always shown first. The order is only applied to file
+    systems that list directories with records, such as
+    :class:`~kivymd_extensions.filemanager.libs.listing.ScandirFileSystem`,
+    others are sorted by `sort_func`.
+
+    :attr:`sort_by` is an :class:`~kivy.properties.OptionProperty`
+    and defaults to `'name'`.
+    """
+
+    sort_reverse = BooleanProperty(False)
+    """
+    Whether the entries are sorted in the descending order.
+
+    :attr:`sort_reverse` is an :class:`~kivy.properties.BooleanProperty`
+    and defaults to `False`.
+    """
+
+    type_detector = ObjectProperty(None, allownone=True)
+    """
+    :class:`~kivymd_extensions.filemanager.libs.filetype.FileTypeDetector`
+    object that detects the types of the displayed files without a
+    meaningful extension.
+
+    :attr:`type_detector` is an :class:`~kivy.properties.ObjectProperty`
+    and defaults to `None`.
+    """
+
+    directory_counter = ObjectProperty(None, allownone=True)
+    """
+    :class:`~kivymd_extensions.filemanager.libs.listing.DirectoryCounter`
+    object that counts the entries of the displayed directories. The counts
+    are not shown if it is None.
+
+    :attr:`directory_counter` is an :class:`~kivy.properties.ObjectProperty`
+    and defaults to `None`.
+    """
+
+    directory_model = ObjectProperty(None, allownone=True)
+    """
+    :class:`~kivymd_extensions.filemanager.libs.listing.DirectoryModel`
+    object through which the directories are listed, so the listings are
+    shared with the directory tree of the tab. The directories are listed
+    with :attr:`file_system` if it is None.
+
+    :attr:`directory_model` is an :class:`~kivy.properties.ObjectProperty`
+    and defaults to `None`.
+    """
+
+    thumbnail_loader = ObjectProperty(None, allownone=True)
+    """
+    :class:`~kivymd_extensions.filemanager.libs.thumbnails.ThumbnailLoader`
+    object that makes the thumbnails of images. Images are shown with icons
+    if it is None.
+
+    :attr:`thumbnail_loader` is an :class:`~kivy.properties.ObjectProperty`
+    and defaults to `None`.
+    """
+
+    suspended = BooleanProperty(False)
+    """
+    Whether the entries are released while the view is not shown, see
+    :meth:`suspend`.
+
+    :attr:`suspended` is an :class:`~kivy.properties.BooleanProperty`
+    and defaults to `False`.
+    """
+
     def __init__(self, **kwargs):
+        self._trigger_resort = Clock.create_trigger(self.resort)
         super().__init__(**kwargs)
         self.entry_released_allow = False
+        # <kivymd_extensions.filemanager.libs.tasks.BackgroundTask object>
+        # that loads the directory.
+        self._load_task = None
+        # Latest `(index, total)` progress of the load.
+        self._load_progress = (0, 0)
+        # The entries of the previous directory are shown until the first
+        # entries of the new one are loaded.
+        self._load_cleared = False
+        # Records of the listed directory by name, see
+        # :class:`~kivymd_extensions.filemanager.libs.listing.EntryRecord`.
+        self._records = None
+        # Shown entries of the directory by name, without the parent
+        # directory.
+        self._shown_entries = {}
+        # <kivymd_extensions.filemanager.libs.sorting.ListingSorter object>
+        # of the records.
+        self._sorter = None
+        self._trigger_show_progress = Clock.create_trigger(
+            self._show_load_progress, LOAD_PROGRESS_DELAY
+        )
+        # `(path, scroll_y)` of the view when it was suspended.
+        self._resume_state = None
+
+    def suspend(self):
+        """
+        Releases the entries of the directory. Only the path, the scroll
+        position and the selection are kept, the directory is not read until
+        :meth:`resume` is called.
+        """
+
+        if self.suspended:
+            return
+        self.suspended = True
+        self.stop_loading()
+        self._resume_state = (self.path, self.ids.rv.scroll_y)
+        self._items = []
+        self._records = None
+        self._shown_entries = {}
+        self._sorter = None
+        self.files[:] = []
+        self.ids.rv.data = []
+
+    def resume(self):
+        """
+        Shows the entries of the directory again from its cached listing and
+        restores the scroll position.
+        """
+
+        if not self.suspended:
+            return
+        self.suspended = False
+        path = self._resume_state[0]
+        if self.path != path:
+            # The path of a hidden tab follows the path of the manager, see
+            # `filemanager.kv`, the directory is read when it is restored.
+            self.path = path
+        else:
+            self._update_files()
+
+    def stop_loading(self):
+        """Cancels loading of the directory, the loaded entries are kept."""
+
+        if self._load_task:
+            self._load_task.cancel()
+            self._load_task = None
+        self._trigger_show_progress.cancel()
+        self._hide_progress()
+
+    def cancel(self, *args):
+        self.stop_loading()
+        super().cancel(*args)
+
+    def refresh(self):
+        """
+        Reads the directory again in the background and updates only the
+        entries of the files that were added, removed or changed.
+        """
+
+        if self._load_task or self._records is None:
+            self._update_files()
+            return
+        self._load_task = BackgroundTask(
+            target=self._find_changes,
+            args=(self.path, self._records),
+            on_progress=self._on_load_progress,
+            on_results=self._on_changes_found,
+            on_complete=self._on_refresh_complete,
+        ).start()
+
+    def update_entries(self, paths):
+        """
+        Adds, removes or updates the entries of the `paths` files without
+        reading the whole directory again. Paths to files in other
+        directories are ignored.
+        """
+
+        if self._load_task or self._records is None:
+            self._update_files()
+            return
+        directory = normpath(self.path)
+        paths = [
+            path
+            for path in dict.fromkeys(map(normpath, paths))
+            if dirname(path) == directory
+        ]
+        names = [basename(path) for path in paths]
+        records = dict(self._records)
+        for path, name in zip(paths, names):
+            record = self.file_system.get_record(path)
+            if record is None:
+                records.pop(name, None)
+            else:
+                records[name] = record
+        data = self.ids.rv.data
+        # The old entries are taken out first, so the other entries stay
+        # sorted by the keys of the old records while they are searched.
+        keys = self._sorter.get_keys(self.sort_by)
+        for name in names:
+            entry = self._shown_entries.pop(name, None)
+            if entry is not None:
+                self._remove_entry(self._find_entry(data, entry, keys))
+        self._sorter = self._sorter.update(records, names)
+        keys = self._sorter.get_keys(self.sort_by)
+        controller = ref(self)
+        for path, name in zip(paths, names):
+            record = records.get(name)
+            if (
+                record is None
+                or not self._apply_filters([path])
+                or (record.hidden and not self.show_hidden)
+            ):
+                continue
+            entry = self._create_entry_widget(
+                {
+                    "name": name,
+                    "path": path,
+                    "controller": controller,
+                    "isdir": record.is_dir,
+                    "parent": None,
+                    "sep": sep,
+                    "record": record,
+                }
+            )
+            index = self._find_position(data, record.is_dir, keys[name], keys)
+            data.insert(index, entry)
+            self._items.insert(index, entry)
+            self.files.insert(index, path)
+            self._shown_entries[name] = entry
+        self._records = records
 
     def entry_released(self, entry, touch):
         """
@@ -183,16 +606,361 @@ class CustomFileChooserIcon(FileChooserController):
                     else:
                         self.dispatch("on_submit", self.selection, touch)
 
-    def _create_entry_widget(self, ctx):
-        widget = super()._create_entry_widget(ctx)
-        kctx = QueryDict(ctx)
-        if os.path.isdir(kctx["path"]):
-            widget.image.icon = self.icon_folder
+    def resort(self, *args):
+        """
+        Orders the entries by :attr:`sort_by` and :attr:`sort_reverse`
+        without reading the directory again.
+        """
+
+        if self._load_task or self._sorter is None:
+            self._update_files()
+            return
+        data = self.ids.rv.data
+        names = [item["name"] for item in data[self._get_pardir_count(data) :]]
+        # The first sort in an order computes the keys of all entries.
+        self._load_task = BackgroundTask(
+            target=lambda task, sorter, *args: task.post_results(
+                sorter.sort(*args)
+            ),
+            args=(self._sorter, names, self.sort_by, self.sort_reverse),
+            on_results=self._on_entries_sorted,
+            on_complete=self._on_refresh_complete,
+        ).start()
+
+    def request_thumbnail(self, path, callback):
+        """
+        Requests the thumbnail of the `path` file if it is an image, see
+        :meth:`~kivymd_extensions.filemanager.libs.thumbnails.ThumbnailLoader.request`.
+        """
+
+        loader = self.thumbnail_loader
+        if not loader or not is_image(path):
+            return None
+        get_record = getattr(self.file_system, "get_record", get_path_record)
+        record = get_record(path)
+        if record is None or record.is_dir:
+            return None
+        return loader.request(path, record.mtime, record.size, callback)
+
+    def request_file_type(self, path, callback):
+        """
+        Requests the detection of the type of the `path` file if its name
+        does not tell it, see
+        :meth:`~kivymd_extensions.filemanager.libs.filetype.FileTypeDetector.request`.
+        """
+
+        if not self.type_detector or not needs_sniffing(basename(path)):
+            return None
+        return self.type_detector.request(path, callback)
+
+    def request_item_count(self, path, callback):
+        """
+        Requests the number of entries in the `path` directory, see
+        :meth:`~kivymd_extensions.filemanager.libs.listing.DirectoryCounter.request`.
+        """
+
+        if not self.directory_counter:
+            return None
+        return self.directory_counter.request(path, callback)
+
+    def on_sort_by(self, instance, value):
+        self._trigger_resort()
+
+    def on_sort_reverse(self, instance, value):
+        self._trigger_resort()
+
+    def on_entries_cleared(self):
+        self._shown_entries = {}
+        self.ids.rv.data = []
+
+    def _update_files(self, *args, **kwargs):
+        # Unlike the base class, the directory is read and its entries are
+        # created on a background thread, the grid is filled in chunks.
+        if self.suspended:
+            return
+        self.stop_loading()
+        if self.rootpath:
+            rootpath = realpath(self.rootpath)
+            if not realpath(self.path).startswith(rootpath):
+                self.path = rootpath
+                return
+        self.path = abspath(self.path)
+        self._load_progress = (0, 0)
+        self._load_cleared = False
+        self._records = None
+        self._shown_entries = {}
+        self._sorter = None
+        self._load_task = BackgroundTask(
+            target=self._load_entries,
+            args=(kwargs.get("path", self.path),),
+            on_progress=self._on_load_progress,
+            on_results=self._on_load_results,
+            on_complete=self._on_load_complete,
+        ).start()
+        self._trigger_show_progress()
+
+    def _load_entries(self, task, path):
+        # Runs on the thread of the task.
+        path = expanduser(path)
+        if isfile(path):
+            path = dirname(path)
+        entries = []
+        if not self._is_root(path):
+            entries.append(self._create_pardir_entry(path))
+        file_system = self.file_system
+        lister = self.directory_model or file_system
+        try:
+            if hasattr(lister, "scan"):
+                names = lister.scan(
+                    path,
+                    canceled=lambda: task.canceled,
+                    on_progress=lambda count: task.post_progress(
+                        index=count, total=count
+                    ),
+                )
+                if names is None:
+                    return
+                sorter = ListingSorter(names)
+                task.post_progress(records=names, sorter=sorter)
+            else:
+                names = file_system.listdir(path)
+                sorter = None
+        except OSError:
+            Logger.exception(f"Unable to open directory <{path}>")
+            task.post_results(entries)
+            return
+        records = sorter.records if sorter else {}
+        files = self._apply_filters([normpath(join(path, n)) for n in names])
+        if not self.show_hidden:
+            is_hidden = file_system.is_hidden
+            files = [fn for fn in files if not is_hidden(fn)]
+        if sorter is None:
+            files = self.sort_func(files, file_system)
+        else:
+            paths = {basename(fn): fn for fn in files}
+            files = [
+                paths[name]
+                for name in sorter.sort(
+                    list(paths), self.sort_by, self.sort_reverse
+                )
+            ]
+        total = len(files)
+        controller = ref(self)
+        for index, fn in enumerate(files):
+            if task.canceled:
+                return
+            name = basename(fn)
+            record = records.get(name)
+            isdir = record.is_dir if record else file_system.is_dir(fn)
+            entries.append(
+                self._create_entry_widget(
+                    {
+                        "name": name,
+                        "path": fn,
+                        "controller": controller,
+                        "isdir": isdir,
+                        "parent": None,
+                        "sep": sep,
+                        "record": record,
+                    }
+                )
+            )
+            if len(entries) >= LOAD_CHUNK_SIZE:
+                task.post_results(entries)
+                task.post_progress(index=index + 1, total=total)
+                entries = []
+        task.post_results(entries)
+
+    def _find_changes(self, task, path, records):
+        # Runs on the thread of the task.
+        try:
+            new_records = (self.directory_model or self.file_system).scan(
+                path, canceled=lambda: task.canceled
+            )
+        except OSError:
+            new_records = {}
+        if new_records is None:
+            return
+        task.post_results(
+            [
+                normpath(join(path, name))
+                for name in records.keys() | new_records.keys()
+                if records.get(name) != new_records.get(name)
+            ]
+        )
+
+    def _get_pardir_count(self, data):
+        return 1 if data and data[0]["name"] == ".." + sep else 0
+
+    def _find_position(self, data, isdir, key, keys):
+        # Returns the index at which an entry with `key` is inserted into
+        # `data`, which is sorted by `keys` with the directories first.
+        low, high = self._get_pardir_count(data), len(data)
+        while low < high:
+            middle = (low + high) // 2
+            if data[middle]["isdir"]:
+                low = middle + 1
+            else:
+                high = middle
+        if isdir:
+            low, high = self._get_pardir_count(data), low
         else:
-            if self.get_icon_file:
-                widget.image.icon = self.get_icon_file(kctx["path"])
+            high = len(data)
+        return find_position(
+            _EntryKeys(data, keys), key, self.sort_reverse, low, high
+        )
+
+    def _find_entry(self, data, entry, keys):
+        # Returns the index of `entry` in `data`, see `_find_position`.
+        key = keys[entry["name"]]
+        index = self._find_position(data, entry["isdir"], key, keys)
+        while index < len(data) and keys.get(data[index]["name"]) == key:
+            if data[index] is entry:
+                return index
+            index += 1
+        return next(i for i, item in enumerate(data) if item is entry)
+
+    def _remove_entry(self, index):
+        del self.ids.rv.data[index]
+        del self._items[index]
+        del self.files[index]
+
+    def _is_root(self, path):
+        if self.rootpath:
+            return realpath(path) == realpath(self.rootpath)
+        if platform == "win":
+            return splitdrive(path)[1] in (sep, "/")
+        return normpath(path) == sep
+
+    def _create_pardir_entry(self, path):
+        if platform == "win":
+            path = path[: path.rfind(sep)]
+            if sep not in path:
+                path += sep
+        else:
+            path = ".." + sep
+        return self._create_entry_widget(
+            {
+                "name": ".." + sep,
+                "path": path,
+                "controller": ref(self),
+                "isdir": True,
+                "parent": None,
+                "sep": sep,
+                "get_nice_size": lambda: "",
+                "item_count": None,
+            }
+        )
+
+    def _show_load_progress(self, *args):
+        if self._load_task:
+            self._show_progress()
+            self._progress.index, self._progress.total = self._load_progress
+
+    def _on_load_progress(self, task, progress):
+        if task is not self._load_task:
+            return
+        if "records" in progress:
+            self._records = progress["records"]
+            self._sorter = progress["sorter"]
+        if "index" not in progress:
+            return
+        self._load_progress = (progress["index"], progress["total"])
+        if self._progress:
+            self._progress.index, self._progress.total = self._load_progress
 
-        return widget
+    def _on_load_results(self, task, entries):
+        if task is not self._load_task:
+            return
+        if not self._load_cleared:
+            self._load_cleared = True
+            self._items = []
+            self.dispatch("on_entries_cleared")
+        self._items.extend(entries)
+        self._shown_entries.update(
+            (entry["name"], entry)
+            for entry in entries
+            if entry["name"] != ".." + sep
+        )
+        self.ids.rv.data.extend(entries)
+
+    def _on_load_complete(self, task):
+        if task is not self._load_task:
+            return
+        if not self._load_cleared:
+            # The directory could not be read.
+            self._items = []
+            self.dispatch("on_entries_cleared")
+        self.files[:] = self._get_file_paths(self._items)
+        self.stop_loading()
+        if self._resume_state:
+            path, scroll_y = self._resume_state
+            self._resume_state = None
+            if path == self.path:
+                # The grid is laid out with the new data on the next frame.
+                Clock.schedule_once(
+                    lambda dt: setattr(self.ids.rv, "scroll_y", scroll_y)
+                )
+
+    def _on_changes_found(self, task, paths):
+        if task is self._load_task:
+            self._load_task = None
+            self.update_entries(paths)
+
+    def _on_entries_sorted(self, task, names):
+        if task is not self._load_task:
+            return
+        self._load_task = None
+        data = self.ids.rv.data
+        offset = self._get_pardir_count(data)
+        entries = self._shown_entries
+        self._items = data[:offset] + [entries[name] for name in names]
+        self.ids.rv.data = list(self._items)
+        self.files[:] = self._get_file_paths(self._items)
+
+    def _on_refresh_complete(self, task):
+        if task is self._load_task:
+            self._load_task = None
+
+    def _create_entry_widget(self, ctx):
+        # Instead of a widget, the entry is the data of a cell of the grid.
+        path = ctx["path"]
+        if ctx["isdir"]:
+            icon = self.icon_folder
+        else:
+            icon = self.get_icon_file(path) if self.get_icon_file else ""
+        if "get_nice_size" in ctx:
+            get_nice_size = ctx["get_nice_size"]
+        else:
+            get_nice_size = partial(self.get_nice_size, path)
+        entry = QueryDict(
+            path=path,
+            name=ctx["name"],
+            isdir=ctx["isdir"],
+            icon=icon,
+            get_nice_size=get_nice_size,
+            controller=self,
+            selected=False,
+        )
+        # The size label is made from the listed metadata when the entry is
+        # displayed, without reading the file again.
+        record = ctx.get("record")
+        if record and not record.is_dir:
+            entry.file_size = record.size
+        if "item_count" in ctx:
+            entry.item_count = ctx["item_count"]
+        return entry
 
     def _gen_label(self, ctx):
+        if ctx.isdir:
+            count = ctx.get("item_count")
+            if count is None:
+                return ""
+            return f"{count} item" if count == 1 else f"{count} items"
+        if "file_size" in ctx:
+            size = ctx.file_size
+            for unit in filesize_units:
+                if size < 1024.0:
+                    return "%1.0f %s" % (size, unit)
+                size /= 1024.0
         return ctx.get_nice_size()
@@ -0,0 +1,596 @@
+import os
+from os.path import abspath, dirname, join, normpath, sep, splitdrive
+
+from kivy.lang import Builder
+from kivy.logger import Logger
+from kivy.metrics import dp
+from kivy.properties import (
+    BooleanProperty,
+    NumericProperty,
+    ObjectProperty,
+    StringProperty,
+)
+from kivy.clock import Clock
+from kivy.uix.boxlayout import BoxLayout
+from kivy.uix.recycleview.views import RecycleDataViewBehavior
+from kivy.utils import platform
+
+from kivymd_extensions.filemanager.libs.plugins.contextmenu import (
+    ContextMenuEntry,
+)
+from kivymd_extensions.filemanager.libs.listing import get_path_record
+from kivymd_extensions.filemanager.libs.tasks import BackgroundTask
+from kivymd_extensions.filemanager.libs.tools import get_icon_for_treeview
+from kivymd_extensions.filemanager.libs.tree import TreeModel
+
+Builder.load_string(
+    """
+#:import os os
+#:import filemanager kivymd_extensions.filemanager
+
+
+<FileTreeEntry>
+    padding: root.indent, 0, "10dp", 0
+    spacing: "10dp"
+
+    canvas.before:
+        Color:
+            rgba:
+                (app.theme_cls.bg_light \
+                if app.theme_cls.theme_style == "Dark" \
+                else app.theme_cls.bg_darkest) \
+                if self.selected else (0, 0, 0, 0)
+        Rectangle:
+            pos: self.pos
+            size: self.size
+        Color:
+            rgba: 1, 1, 1, int(not self.is_leaf)
+        Rectangle:
+            source:
+                os.path.join(os.path.dirname(os.path.dirname(filemanager.tools.__file__)), \
+                'data', 'images', "{}.png".format('opened' if self.is_open else 'closed'))
+            size: self.height / 2.5, self.height / 2.5
+            pos: self.x + self.indent - dp(14), self.center_y - self.height / 5
+
+    MDIcon:
+        icon: root.icon
+        size_hint_x: None
+        width: "20dp"
+        font_size: "15sp"
+        theme_text_color: "Custom"
+        text_color: app.theme_cls.primary_color
+
+    Label:
+        text_size: self.width, None
+        halign: "left"
+        shorten: True
+        text: root.name.split("#")[0] if "#" in root.name else root.name
+        bold: True
+        font_size: "12sp"
+        color: app.theme_cls.text_color
+
+
+<FileChooserTree>
+
+    RecycleView:
+        id: rv
+        viewclass: "FileTreeEntry"
+        do_scroll_x: False
+
+        RecycleBoxLayout:
+            orientation: "vertical"
+            default_size: None, root.row_height
+            default_size_hint: 1, None
+            size_hint_y: None
+            height: self.minimum_height
+"""
+)
+
+
+class FileTreeEntry(RecycleDataViewBehavior, BoxLayout):
+    """
+    Row of the directory tree. The rows are created only for the visible
+    directories and are reused while scrolling.
+    """
+
+    path = StringProperty()
+    name = StringProperty()
+    icon = StringProperty()
+    depth = NumericProperty()
+    is_leaf = BooleanProperty(False)
+    is_open = BooleanProperty(False)
+    selected = BooleanProperty(False)
+
+    index = NumericProperty()
+    """Index of the shown row."""
+
+    indent = NumericProperty()
+    """
+    Space before the icon, where the arrow that expands and collapses the
+    directory is drawn.
+    """
+
+    tree = ObjectProperty()
+    """
+    :class:`FileChooserTree` object.
+    """
+
+    def refresh_view_attrs(self, rv, index, data):
+        self.index = index
+        self.tree = rv.parent
+        self.path = data["path"]
+        self.name = data["name"]
+        self.depth = data["depth"]
+        self.is_leaf = data["is_leaf"]
+        self.is_open = data["is_open"]
+        self.indent = dp(24) + dp(16) * self.depth
+        self.selected = self.path == self.tree.selected_path
+        self.icon = self.tree.get_icon(self.path)
+
+    def on_touch_down(self, touch):
+        if not self.collide_point(*touch.pos) or (
+            "button" in touch.profile
+            and touch.button in ("scrollup", "scrolldown")
+        ):
+            return super().on_touch_down(touch)
+        tree = self.tree
+        if not self.is_leaf and (
+            touch.x < self.x + self.indent or touch.is_double_tap
+        ):
+            tree.toggle(self.path)
+            return True
+        path = self.path
+        # The row may show another directory when an item of the context
+        # menu is chosen, so only its path is given.
+        tree.manager.tap_on_file_dir(
+            (ContextMenuEntry(path, self), touch), "FileChooserList"
+        )
+        if not tree.manager.context_menu_open and path != tree.pardir_path:
+            tree.selected_path = path
+            tree.callback(path)
+        return True
+
+
+class FileChooserTree(BoxLayout):
+    """
+    Tree of the directories in :attr:`path`. The tree is a flat list of the
+    visible rows, see :class:`~kivymd_extensions.filemanager.libs.tree.TreeModel`,
+    so widgets are created only for the rows on screen. The subdirectories
+    are read on a background thread when a directory is expanded.
+
+    The subdirectories of the directories near the rows on screen are read
+    ahead on another background thread, so the directories without
+    subdirectories are shown without the arrow and are expanded at once.
+    """
+
+    path = StringProperty()
+    """
+    Path to the root directory of the tree.
+
+    :attr:`path` is an :class:`~kivy.properties.StringProperty`
+    and defaults to `''`.
+    """
+
+    file_system = ObjectProperty()
+    """
+    File system that lists the directories, a
+    :class:`~kivymd_extensions.filemanager.libs.listing.ScandirFileSystem`
+    object or any :class:`~kivy.uix.filechooser.FileSystemAbstract` object.
+
+    :attr:`file_system` is an :class:`~kivy.properties.ObjectProperty`
+    and defaults to `None`.
+    """
+
+    callback = ObjectProperty()
+    """
+    Function that is called with the path to the selected directory.
+
+    :attr:`callback` is an :class:`~kivy.properties.ObjectProperty`
+    and defaults to `None`.
+    """
+
+    manager = ObjectProperty()
+    """
+    ``FileManager`` object.
+
+    :attr:`manager` is an :class:`~kivy.properties.ObjectProperty`
+    and defaults to `None`.
+    """
+
+    directory_model = ObjectProperty(None, allownone=True)
+    """
+    :class:`~kivymd_extensions.filemanager.libs.listing.DirectoryModel`
+    object through which the directories are listed. The subdirectories of
+    the directories listed by the other views of the tab are shown without
+    reading them again.
+
+    :attr:`directory_model` is an :class:`~kivy.properties.ObjectProperty`
+    and defaults to `None`.
+    """
+
+    show_hidden = BooleanProperty(False)
+    """
+    Whether hidden directories are shown.
+
+    :attr:`show_hidden` is an :class:`~kivy.properties.BooleanProperty`
+    and defaults to `False`.
+    """
+
+    selected_path = StringProperty()
+    """
+    Path to the highlighted directory.
+
+    :attr:`selected_path` is an :class:`~kivy.properties.StringProperty`
+    and defaults to `''`.
+    """
+
+    row_height = NumericProperty(dp(28))
+    """
+    Height of the rows.
+
+    :attr:`row_height` is an :class:`~kivy.properties.NumericProperty`
+    and defaults to `dp(28)`.
+    """
+
+    prefetch_limit = NumericProperty(64)
+    """
+    Maximum number of directories read ahead at a time. The directories
+    near the rows on screen are read first, the next ones are read when
+    these are read. Nothing is read ahead if it is `0`.
+
+    :attr:`prefetch_limit` is an :class:`~kivy.properties.NumericProperty`
+    and defaults to `64`.
+    """
+
+    suspended = BooleanProperty(False)
+    """
+    Whether the rows are released while the tree is not shown, see
+    :meth:`suspend`.
+
+    :attr:`suspended` is an :class:`~kivy.properties.BooleanProperty`
+    and defaults to `False`.
+    """
+
+    pardir_path = ".." + sep
+
+    def __init__(self, **kwargs):
+        self._trigger_reset = Clock.create_trigger(self._reset)
+        # <kivymd_extensions.filemanager.libs.tree.TreeModel object>
+        self.model = TreeModel()
+        # <kivymd_extensions.filemanager.libs.tasks.BackgroundTask objects>
+        # that read the subdirectories by the paths to the directories.
+        self._load_tasks = {}
+        # <kivymd_extensions.filemanager.libs.tasks.BackgroundTask object>
+        # that reads the subdirectories ahead.
+        self._prefetch_task = None
+        # Whether the subdirectories near the rows on screen are read again
+        # when the running task is complete.
+        self._prefetch_pending = False
+        # Paths to the read directories whose subdirectories may be changed.
+        self._stale_paths = set()
+        self._trigger_prefetch = Clock.create_trigger(self._prefetch, 0.1)
+        # Icons by the paths to the shown directories.
+        self._icons = {}
+        self._directory_model = None
+        # `(expanded, scroll_y)` of the tree when it was suspended.
+        self._resume_state = None
+        super().__init__(**kwargs)
+        Clock.schedule_once(
+            lambda dt: self.ids.rv.bind(scroll_y=self._trigger_prefetch)
+        )
+
+    def on_path(self, instance, path):
+        self._trigger_reset()
+
+    def on_directory_model(self, instance, model):
+        if self._directory_model:
+            self._directory_model.unbind(on_directories=self._on_directories)
+        self._directory_model = model
+        if model:
+            model.bind(on_directories=self._on_directories)
+
+    def on_show_hidden(self, instance, value):
+        self._stale_paths.update(self.model.get_read_directories())
+        self.refresh()
+
+    def on_selected_path(self, instance, path):
+        for view in self.ids.rv.layout_manager.children:
+            view.selected = view.path == path
+
+    def suspend(self):
+        """
+        Releases the rows and the read subdirectories. Only the expanded
+        directories, the scroll position and the selected directory are
+        kept, the directories are not read until :meth:`resume` is called.
+        """
+
+        if self.suspended:
+            return
+        self.suspended = True
+        self.stop_loading()
+        self._resume_state = (set(self.model.expanded), self.ids.rv.scroll_y)
+        self._stale_paths.clear()
+        self._icons.clear()
+        self._apply(self.model.set_root(self.model.root, self.model.pardir))
+
+    def resume(self):
+        """
+        Reads the root and the expanded directories again, which are
+        usually taken from the cached listings, and restores the scroll
+        position.
+        """
+
+        if not self.suspended:
+            return
+        self.suspended = False
+        self.model.expanded.update(self._resume_state[0])
+        self.load_children(self.model.root)
+
+    def get_icon(self, path):
+        """
+        Returns the icon of the `path` directory. The icon is computed once
+        from the cached record of the directory, since the rows are reused
+        while scrolling.
+        """
+
+        icon = self._icons.get(path)
+        if icon is None:
+            get_record = getattr(
+                self.file_system, "get_record", get_path_record
+            )
+            icon = self._icons[path] = get_icon_for_treeview(
+                path, os.path.splitext(path)[1], True, get_record(path)
+            )
+        return icon
+
+    def refresh(self):
+        """
+        Reads the shown directories again. The expanded directories stay
+        expanded.
+        """
+
+        self.update_directories(self.model.get_shown_directories())
+
+    def update_directories(self, paths):
+        """
+        Reads the `paths` directories again if their subdirectories are
+        shown.
+        """
+
+        if self.suspended:
+            return
+        shown = set(self.model.get_shown_directories())
+        for path in paths:
+            path = normpath(path)
+            # The access to the subdirectories may be changed.
+            for child in list(self._icons):
+                if dirname(child) == path:
+                    del self._icons[child]
+            if path in shown:
+                self.load_children(path)
+            elif self.model.get_children(path) is not None:
+                # The directory is read ahead again if it is near the rows
+                # on screen.
+                self._stale_paths.add(path)
+                self._trigger_prefetch()
+
+    def toggle(self, path):
+        if self.model.is_expanded(path):
+            self.collapse(path)
+        else:
+            self.expand(path)
+
+    def expand(self, path):
+        self._apply(self.model.expand(path))
+        # The cached subdirectories are shown until they are read again.
+        self.load_children(path)
+
+    def collapse(self, path):
+        task = self._load_tasks.pop(path, None)
+        if task:
+            task.cancel()
+        self._apply(self.model.collapse(path))
+
+    def load_children(self, path):
+        """Reads the subdirectories of `path` on a background thread."""
+
+        if path in self._load_tasks:
+            return
+        self._load_tasks[path] = BackgroundTask(
+            target=self._read_children,
+            args=(path,),
+            on_results=self._on_children_read,
+            on_complete=self._on_load_complete,
+        ).start()
+
+    def stop_loading(self):
+        for task in self._load_tasks.values():
+            task.cancel()
+        self._load_tasks.clear()
+        if self._prefetch_task:
+            self._prefetch_task.cancel()
+            self._prefetch_task = None
+        self._prefetch_pending = False
+
+    def _reset(self, *args):
+        if self.suspended:
+            # The expanded directories of the previous root are forgotten.
+            self._resume_state = (set(), 1)
+        self.stop_loading()
+        self._stale_paths.clear()
+        self._icons.clear()
+        path = normpath(abspath(self.path))
+        self._apply(self.model.set_root(path, self._get_pardir(path)))
+        if not self.suspended:
+            self.load_children(path)
+
+    def _get_pardir(self, path):
+        if platform == "win":
+            is_root = splitdrive(path)[1] in (sep, "/")
+        else:
+            is_root = path == sep
+        return None if is_root else self.pardir_path
+
+    def _read_children(self, task, path):
+        # Runs on the thread of the task.
+        task.post_results([(path, self._list_children(path))])
+
+    def _list_children(self, path):
+        # Returns the sorted names of the shown subdirectories of `path`.
+        file_system = self.file_system
+        try:
+            if self.directory_model:
+                return self._get_names(
+                    self.directory_model.list_directories(path)
+                )
+            if hasattr(file_system, "list_directories"):
+                return self._get_names(file_system.list_directories(path))
+            names = [
+                name
+                for name in file_system.listdir(path)
+                if file_system.is_dir(join(path, name))
+                and (
+                    self.show_hidden
+                    or not file_system.is_hidden(join(path, name))
+                )
+            ]
+        except OSError:
+            # The directory cannot be read, it is shown as a leaf.
+            Logger.warning(f"FileChooserTree: unable to open <{path}>")
+            names = []
+        return sorted(names, key=str.casefold)
+
+    def _get_names(self, directories):
+        # Returns the sorted names of the shown `directories`, which are
+        # given as a dictionary of whether they are hidden by name.
+        return sorted(
+            (
+                name
+                for name, hidden in directories.items()
+                if self.show_hidden or not hidden
+            ),
+            key=str.casefold,
+        )
+
+    def _on_directories(self, model, path, directories):
+        # Directories listed by the other views of the tab. The directories
+        # read by the tree itself are set when its task posts them.
+        if self.suspended or path in self._load_tasks:
+            return
+        if path != self.model.root and self.model.index(path) is None:
+            return
+        self._stale_paths.discard(path)
+        self._apply(self.model.set_children(path, self._get_names(directories)))
+
+    def _on_children_read(self, task, results):
+        for path, names in results:
+            if self._load_tasks.get(path) is task:
+                self._stale_paths.discard(path)
+                self._apply(self.model.set_children(path, names))
+        self._load_open_directories()
+        self._trigger_prefetch()
+
+    def _load_open_directories(self):
+        # Reads the expanded directories that are shown without their
+        # subdirectories, when the tree is resumed.
+        for row in self.model.rows:
+            if row["is_open"] and self.model.get_children(row["path"]) is None:
+                self.load_children(row["path"])
+
+    def _on_load_complete(self, task):
+        path = task.args[0]
+        if self._load_tasks.get(path) is task:
+            del self._load_tasks[path]
+        if not self._load_tasks and self._resume_state and not self.suspended:
+            scroll_y = self._resume_state[1]
+            self._resume_state = None
+            # The rows are laid out with the new data on the next frame.
+            Clock.schedule_once(
+                lambda dt: setattr(self.ids.rv, "scroll_y", scroll_y)
+            )
+
+    def _prefetch(self, *args):
+        if self.suspended:
+            return
+        if self._prefetch_task:
+            self._prefetch_pending = True
+            return
+        paths = self._get_prefetch_paths()
+        if paths:
+            self._prefetch_task = BackgroundTask(
+                target=self._read_ahead,
+                args=(paths,),
+                on_results=self._on_read_ahead,
+                on_complete=self._on_prefetch_complete,
+            ).start()
+
+    def _get_prefetch_paths(self):
+        # Returns the paths to the unread directories from the rows on screen
+        # and the rows of a screen before and after them.
+        rows = self.model.rows
+        views = self.ids.rv.layout_manager.children
+        if not rows or not views or self.prefetch_limit <= 0:
+            return []
+        first = min(view.index for view in views)
+        last = max(view.index for view in views)
+        margin = last - first + 1
+        indexes = list(range(first, last + 1))
+        for offset in range(1, margin + 1):
+            indexes.extend((last + offset, first - offset))
+        paths = []
+        for index in indexes:
+            if not 0 <= index < len(rows):
+                continue
+            path = rows[index]["path"]
+            if (
+                path != self.pardir_path
+                and path not in self._load_tasks
+                and (
+                    self.model.get_children(path) is None
+                    or path in self._stale_paths
+                )
+            ):
+                paths.append(path)
+                if len(paths) >= self.prefetch_limit:
+                    break
+        return paths
+
+    def _read_ahead(self, task, paths):
+        # Runs on the thread of the task.
+        for path in paths:
+            if task.canceled:
+                return
+            task.post_results([(path, self._list_children(path))])
+
+    def _on_read_ahead(self, task, results):
+        if task is not self._prefetch_task:
+            return
+        for path, names in results:
+            # The directories that are read by an expansion in the meantime
+            # are not replaced.
+            if path not in self._load_tasks and (
+                self.model.get_children(path) is None
+                or path in self._stale_paths
+            ):
+                self._stale_paths.discard(path)
+                self._apply(self.model.set_children(path, names))
+
+    def _on_prefetch_complete(self, task):
+        if task is not self._prefetch_task:
+            return
+        self._prefetch_task = None
+        if self._prefetch_pending or not task.canceled:
+            # The next directories are read until all the directories near
+            # the rows on screen are read.
+            self._prefetch_pending = False
+            self._trigger_prefetch()
+
+    def _apply(self, change):
+        if change is None:
+            return
+        start, stop, rows = change
+        data = self.ids.rv.data
+        if start == 0 and stop == len(data):
+            self.ids.rv.data = rows
+        else:
+            data[start:stop] = rows
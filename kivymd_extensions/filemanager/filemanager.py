@@ -52,6 +52,9 @@ The ``files`` directory contains images whose names correspond to the file types
 .. image:: https://github.com/kivymd/storage/raw/main/filemanager/images/skin-structure-files.png
     :align: center
 
+The images of the theme are packed into texture atlases when the theme is
+first used, see :mod:`~kivymd_extensions.filemanager.libs.skin`.
+
 Color
 -----
 
@@ -76,6 +79,29 @@ Texture
 
     If you are using ``bg_texture`` parameter then ``bg_color`` parameter will be ignored.
 
+Search index
+------------
+
+Files can be searched by name, extension, glob pattern, regular expression or
+fuzzy name, see :class:`~kivymd_extensions.filemanager.libs.query.Query`,
+and by the text in their contents, see
+:class:`~kivymd_extensions.filemanager.libs.grep.ContentSearch`.
+Searches in large directories can be answered from a persistent filename index
+instead of walking the disk:
+
+.. code-block:: python
+
+    FileManager(use_search_index=True, search_index_roots=["/"]).open()
+
+The index is built in the background on the first opening and refreshed
+incrementally on the next ones. Use the :meth:`FileManager.build_search_index`,
+:meth:`FileManager.refresh_search_index` and
+:meth:`FileManager.drop_search_index` methods to manage it for a given root.
+
+While the file manager is open, the directories shown in its tabs are watched
+for changes (with inotify on Linux), the views and the index are updated
+without rescanning.
+
 Events
 ======
 
@@ -144,7 +170,6 @@ import re
 import ast
 import importlib
 import os
-import threading
 
 from kivy.factory import Factory
 from kivy.animation import Animation
@@ -158,12 +183,12 @@ from kivy.properties import (
     BooleanProperty,
     ListProperty,
     OptionProperty,
-    DictProperty,
+    NumericProperty,
 )
 from kivy.uix.boxlayout import BoxLayout
 from kivy.config import Config, ConfigParser
 from kivy.uix.widget import Widget
-from kivy.utils import get_color_from_hex, get_hex_from_color
+from kivy.utils import escape_markup, get_color_from_hex, get_hex_from_color
 
 Config.set("input", "mouse", "mouse,disable_multitouch")
 
@@ -189,7 +214,31 @@ from kivymd.uix.expansionpanel import MDExpansionPanel
 from kivymd.uix.expansionpanel import MDExpansionPanelOneLine
 from kivymd.uix.relativelayout import MDRelativeLayout
 
+from kivymd_extensions.filemanager.libs.filetype import (
+    FileTypeDetector,
+    needs_sniffing,
+)
+from kivymd_extensions.filemanager.libs.grep import ContentSearch, batch_paths
+from kivymd_extensions.filemanager.libs.index import FileIndex
+from kivymd_extensions.filemanager.libs.listing import (
+    DirectoryCounter,
+    DirectoryModel,
+    ScandirFileSystem,
+)
 from kivymd_extensions.filemanager.libs.plugins import PluginBaseDialog
+from kivymd_extensions.filemanager.libs.plugins.contextmenu import (
+    ContextMenuEntry,
+)
+from kivymd_extensions.filemanager.libs.query import QUERY_TYPES, Query
+from kivymd_extensions.filemanager.libs.results import ResultStore, get_mtime
+from kivymd_extensions.filemanager.libs.searchcache import SearchCache
+from kivymd_extensions.filemanager.libs.skin import get_skin_icons
+from kivymd_extensions.filemanager.libs.sorting import SORT_ORDERS, get_type
+from kivymd_extensions.filemanager.libs.tasks import BackgroundTask
+from kivymd_extensions.filemanager.libs.thumbnails import ThumbnailLoader
+from kivymd_extensions.filemanager.libs.tools import get_cache_directory
+from kivymd_extensions.filemanager.libs.walker import PruneRules, TreeWalker
+from kivymd_extensions.filemanager.libs.watcher import FileWatcher
 
 with open(
     os.path.join(os.path.dirname(__file__), "file_chooser_list.kv"),
@@ -228,6 +277,112 @@ class FileManagerTab(BoxLayout, MDTabsBase):
     and defaults to `''`.
     """
 
+    directory_model = ObjectProperty()
+    """
+    :class:`~kivymd_extensions.filemanager.libs.listing.DirectoryModel`
+    object that lists the directories of the tree and of the list of files,
+    so a directory is listed once for both of them.
+
+    :attr:`directory_model` is an :class:`~kivy.properties.ObjectProperty`
+    and defaults to `None`.
+    """
+
+    suspended = BooleanProperty(False)
+    """
+    Whether the entries of the tab are released while another tab is shown,
+    see :meth:`suspend`.
+
+    :attr:`suspended` is an :class:`~kivy.properties.BooleanProperty`
+    and defaults to `False`.
+    """
+
+    def __init__(self, **kwargs):
+        # `(path, callback)` subscriptions to the file watcher.
+        self._watched = []
+        # <kivymd_extensions.filemanager.libs.tasks.BackgroundTask object>
+        self._tree_task = None
+        self.directory_model = DirectoryModel(kwargs["manager"].file_system)
+        super().__init__(**kwargs)
+
+    def on_kv_post(self, base_widget):
+        self.ids.file_chooser_icon.bind(path=self.watch_directories)
+        self.ids.file_chooser_list.bind(path=self.watch_directories)
+        self.watch_directories()
+
+    def watch_directories(self, *args):
+        """
+        Subscribes the directory tree and the list of files of the tab to
+        the changes of their directories.
+        """
+
+        self.unwatch_directories()
+        if self.suspended:
+            return
+        tree_path = self.ids.file_chooser_list.path
+        self._watched = [
+            (self.ids.file_chooser_icon.path, self.on_directory_changed),
+            (tree_path, self.on_tree_changed),
+        ]
+        for path, callback in self._watched:
+            self.manager.watcher.watch(path, callback)
+
+    def suspend(self):
+        """
+        Releases the entries of the directory tree and of the list of files
+        while the tab is not shown. Only their paths, scroll positions and
+        selections are kept.
+        """
+
+        if self.suspended:
+            return
+        self.suspended = True
+        self.unwatch_directories()
+        self.ids.file_chooser_icon.suspend()
+        self.ids.file_chooser_list.suspend()
+
+    def resume(self):
+        """Shows the entries of the tab again from the cached listings."""
+
+        if not self.suspended:
+            return
+        self.suspended = False
+        self.ids.file_chooser_list.resume()
+        self.ids.file_chooser_icon.resume()
+        self.watch_directories()
+
+    def unwatch_directories(self):
+        for path, callback in self._watched:
+            self.manager.watcher.unwatch(path, callback)
+        self._watched = []
+        if self._tree_task:
+            self._tree_task.cancel()
+            self._tree_task = None
+
+    def on_directory_changed(self, path):
+        self.ids.file_chooser_icon.refresh()
+
+    def on_tree_changed(self, path):
+        # The tree takes the subdirectories from the shared listing and is
+        # changed only when they change.
+        if self._tree_task:
+            self._tree_task.cancel()
+        self._tree_task = BackgroundTask(
+            target=self._list_tree_directories,
+            args=(path,),
+            on_complete=self._on_tree_listed,
+        ).start()
+
+    def _list_tree_directories(self, task, path):
+        # Runs on the thread of the task.
+        try:
+            self.directory_model.list_directories(path)
+        except OSError:
+            pass
+
+    def _on_tree_listed(self, task):
+        if self._tree_task is task:
+            self._tree_task = None
+
 
 class FileManagerTextFieldSearch(ThemableBehavior, MDRelativeLayout):
     """The class implements a text field for searching files.
@@ -251,9 +406,12 @@ class FileManagerTextFieldSearch(ThemableBehavior, MDRelativeLayout):
     See :attr:`~kivy.uix.textinput.TextInput.background_active
     """
 
-    type = OptionProperty("name", options=["name", "ext"])
+    type = OptionProperty("name", options=list(QUERY_TYPES) + ["content"])
     """
-    Search files by name or extension. Available options are `'name'`, `'ext'`.
+    Type of the search query. Available options are `'name'`, `'ext'`,
+    `'glob'`, `'regex'`, `'fuzzy'`, `'content'`.
+    See :class:`~kivymd_extensions.filemanager.libs.query.Query` and
+    :class:`~kivymd_extensions.filemanager.libs.grep.ContentSearch`.
 
     :attr:`icon` is an :class:`~kivy.properties.OptionProperty`
     and defaults to `'name'`.
@@ -266,8 +424,8 @@ class FileManagerTextFieldSearch(ThemableBehavior, MDRelativeLayout):
 
     def __init__(self, **kw):
         super().__init__(**kw)
-        # Signal to interrupt the search process
-        self.canceled_search = False
+        # <kivymd_extensions.filemanager.libs.tasks.BackgroundTask object>
+        self.search_task = None
         # <FileManagerTextFieldSearchDialog object>
         self.text_field_search_dialog = None
         # <kivymd.uix.menu.MDDropdownMenu object>
@@ -275,66 +433,165 @@ class FileManagerTextFieldSearch(ThemableBehavior, MDRelativeLayout):
         # Whether to search the entire disk or the current directory.
         self.search_all_disk = False
         self.end_search = False
+        # <kivymd_extensions.filemanager.libs.walker.TreeWalker object>
+        self.walker = None
+        # <kivymd_extensions.filemanager.libs.results.ResultStore object>
+        # with the files found by the last search.
+        self.search_results = None
+        # <FileManagerFilesSearchResultsDialog object>
+        self.files_search_results_dialog = None
         Clock.schedule_once(self.create_menu)
 
     def on_enter(self, instance, value):
         """Called when the user hits 'Enter' in text field."""
 
-        def wait_result(interval):
-            if self.end_search:
-                Clock.unschedule(wait_result)
-                if data_results:
-                    FileManagerFilesSearchResultsDialog(
-                        data_results=data_results, manager=self.manager
-                    ).open()
-                    self.manager.dialog_files_search_results_open = True
-
-        def start_search(interval):
-            threading.Thread(
-                target=get_matching_files,
-                args=(
-                    "/" if self.search_all_disk else self.manager.path,
-                    value,
-                ),
-            ).start()
-
-        def get_matching_files(path, name_file):
-            for d, dirs, files in os.walk(path):
-                if self.canceled_search:
-                    break
-                self.text_field_search_dialog.ids.lbl_dir.text = d
-                for f in files:
-                    self.text_field_search_dialog.ids.lbl_file.text = f
-                    self.manager.ids.lbl_task.text = (
-                        f"Search in [color="
-                        f"{get_hex_from_color(self.theme_cls.primary_color)}]"
-                        f"{os.path.dirname(d)}:[/color] {f}"
-                    )
-                    if self.ids.text_field.hint_text == "Search by name":
-                        if name_file in f:
-                            data_results[f] = os.path.join(d, f)
-                    elif self.ids.text_field.hint_text == "Search by extension":
-                        if f.endswith(name_file):
-                            data_results[f] = os.path.join(d, f)
-            if self.canceled_search:
-                self.canceled_search = False
-            self.end_search = True
-            self.text_field_search_dialog.dismiss()
-
+        if not value:
+            return
+        try:
+            if self.type == "content":
+                query = ContentSearch(value)
+            else:
+                query = Query(value, self.type)
+        except ValueError as error:
+            self.manager.ids.lbl_task.text = str(error)
+            return
         self.text_field_search_dialog = FileManagerTextFieldSearchDialog(
             manager=self.manager
         )
         self.text_field_search_dialog.open()
+        self.files_search_results_dialog = None
+        self.search_results = self.manager.get_search_result_store(query)
         self.end_search = False
-        data_results = {}
-        Clock.schedule_once(start_search, 1)
-        Clock.schedule_interval(wait_result, 0)
+        self.search_task = BackgroundTask(
+            target=self.get_matching_files,
+            args=("/" if self.search_all_disk else self.manager.path, query),
+            on_progress=self.on_search_progress,
+            on_complete=self.on_search_complete,
+        ).start()
+
+    def get_matching_files(self, task, path, query):
+        """
+        Searches for files matching `query` in the `path` directory.
+        Called in the search thread, the found files are added to
+        :attr:`search_results` and their number is posted to `task`.
+        """
+
+        def add_results(paths):
+            if paths:
+                self.search_results.add(paths)
+                task.post_progress(
+                    found=self.search_results.total,
+                    file=os.path.basename(paths[-1]),
+                )
+
+        def walk(root, match, on_directory, depth, ignore_rules):
+            def read_directory(directory):
+                on_directory(directory)
+                task.post_progress(directory=directory)
+
+            self.walker = TreeWalker(
+                root,
+                match=match,
+                rules=rules,
+                on_directory=read_directory,
+                depth=depth,
+                ignore_rules=ignore_rules,
+            )
+            return self.walker.walk()
+
+        rules = self.manager.get_search_rules()
+        if query.type == "content":
+            self.walker = TreeWalker(
+                path,
+                rules=rules,
+                on_directory=lambda d: task.post_progress(directory=d),
+            )
+            for path_to_file, matches in query.search(
+                batch_paths(self.walker.walk()), lambda: task.canceled
+            ):
+                self.search_results.add(
+                    [path_to_file] * len(matches),
+                    [f"{number}: {line}" for number, line in matches],
+                )
+                task.post_progress(
+                    found=self.search_results.total,
+                    file=os.path.basename(path_to_file),
+                )
+            self.walker = None
+            return
+        search_index = self.manager.search_index
+        if search_index and search_index.get_root(path, rules):
+            add_results(search_index.search(path, query, rules))
+            return
+        self.manager.search_cache.search(
+            path,
+            query,
+            walk,
+            rules,
+            on_results=add_results,
+            canceled=lambda: task.canceled,
+        )
+        self.walker = None
+
+    def on_search_progress(self, task, progress):
+        if "directory" in progress:
+            directory = progress["directory"]
+            self.text_field_search_dialog.ids.lbl_dir.text = directory
+            self.manager.ids.lbl_task.text = (
+                f"Search in [color="
+                f"{get_hex_from_color(self.theme_cls.primary_color)}]"
+                f"{os.path.dirname(directory)}:[/color] "
+                f"{os.path.basename(directory)}"
+            )
+        if "found" in progress:
+            self.on_search_results(progress["file"])
+
+    def on_search_results(self, name_file):
+        """Called when new files are added to :attr:`search_results`."""
+
+        self.text_field_search_dialog.ids.lbl_file.text = name_file
+        if not self.files_search_results_dialog:
+            if not self.text_field_search_dialog.ids.check_background.active:
+                self.text_field_search_dialog.dismiss()
+                self.open_files_search_results_dialog()
+        else:
+            self.files_search_results_dialog.update_results()
+
+    def on_search_complete(self, task):
+        self.end_search = True
+        self.text_field_search_dialog.dismiss()
+        if self.files_search_results_dialog:
+            self.files_search_results_dialog.searching = False
+            self.files_search_results_dialog.update_results()
+        elif self.search_results.total:
+            self.open_files_search_results_dialog()
+
+    def cancel_search(self):
+        """Stops the search. The files found so far are kept."""
+
+        if self.search_task:
+            self.search_task.cancel()
+        if self.walker:
+            self.walker.cancel()
+
+    def open_files_search_results_dialog(self):
+        self.files_search_results_dialog = FileManagerFilesSearchResultsDialog(
+            manager=self.manager,
+            results=self.search_results,
+            searching=not self.end_search,
+        )
+        self.files_search_results_dialog.open()
+        self.manager.dialog_files_search_results_open = True
 
     def create_menu(self, interval):
         menu = []
         for text in (
             "Search by extension",
             "Search by name",
+            "Search by glob pattern",
+            "Search by regular expression",
+            "Fuzzy search by name",
+            "Search in contents",
             "All over the disk",
         ):
             menu.append(
@@ -350,13 +607,62 @@ class FileManagerTextFieldSearch(ThemableBehavior, MDRelativeLayout):
                     ),
                 }
             )
+        for option, text in (
+            ("one_filesystem", "Stay on one file system"),
+            ("skip_pseudo_filesystems", "Skip system file systems"),
+            ("use_ignore_files", "Use .gitignore files"),
+            ("sort_by_mtime", "Newest files first"),
+        ):
+            menu.append(
+                {
+                    "text": f"[size=14]{text}[/size]",
+                    "viewclass": "FileManagerItem",
+                    "icon": "checkbox-marked-outline"
+                    if self.manager.config.getint("Search", option)
+                    else "checkbox-blank-outline",
+                    "height": dp(36),
+                    "top_pad": dp(4),
+                    "bot_pad": dp(10),
+                    "divider": None,
+                    "_txt_left_pad": dp(72),
+                    "on_release": lambda x=option: self.toggle_search_option(x),
+                }
+            )
+        menu.append(
+            {
+                "text": "[size=14]Exclude and depth...[/size]",
+                "viewclass": "OneLineListItem",
+                "height": dp(36),
+                "top_pad": dp(4),
+                "bot_pad": dp(10),
+                "divider": None,
+                "on_release": self.open_search_options_dialog,
+            }
+        )
         self.context_menu_search_field = MDDropdownMenu(
             caller=self.ids.lbl_icon_right,
             items=menu,
             width_mult=4,
             background_color=self.theme_cls.bg_dark,
-            max_height=dp(240),
+            max_height=dp(360),
+        )
+
+    def toggle_search_option(self, option):
+        """Switches a boolean option of the `Search` section of settings."""
+
+        self.context_menu_search_field.dismiss()
+        self.manager.config.set(
+            "Search",
+            option,
+            int(not self.manager.config.getint("Search", option)),
         )
+        self.manager.config.write()
+        self.manager.on_search_rules_changed()
+        self.create_menu(0)
+
+    def open_search_options_dialog(self, *args):
+        self.context_menu_search_field.dismiss()
+        FileManagerSearchOptionsDialog(manager=self.manager).open()
 
     def set_type_search(self, text_item):
         self.context_menu_search_field.dismiss()
@@ -367,6 +673,14 @@ class FileManagerTextFieldSearch(ThemableBehavior, MDRelativeLayout):
             self.type = "ext"
         elif item_text == "Search by name":
             self.type = "name"
+        elif item_text == "Search by glob pattern":
+            self.type = "glob"
+        elif item_text == "Search by regular expression":
+            self.type = "regex"
+        elif item_text == "Fuzzy search by name":
+            self.type = "fuzzy"
+        elif item_text == "Search in contents":
+            self.type = "content"
         elif item_text == "All over the disk":
             self.search_all_disk = True
             self.ids.text_field.hint_text += f" {item_text.lower()}"
@@ -379,31 +693,98 @@ class FileManagerFilesSearchResultsDialog(PluginBaseDialog):
     The class implements displaying a list with the results of file search.
     """
 
-    data_results = DictProperty()
+    results = ObjectProperty()
+    """
+    :class:`~kivymd_extensions.filemanager.libs.results.ResultStore` object
+    with the found files.
+    """
 
     manager = ObjectProperty()
     """
     See :class:`FileManager` object.
     """
 
-    def on_open(self):
-        self.ids.rv.data = []
-        for name_file in self.data_results.keys():
-            text = (
-                f"[color={get_hex_from_color(self.theme_cls.primary_color)}]"
-                f"{name_file}[/color] {self.data_results[name_file]}"
-            )
-            self.ids.rv.data.append(
-                {
-                    "viewclass": "OneLineListItem",
-                    "text": text,
-                    "on_release": lambda x=self.data_results[
-                        name_file
-                    ]: self.go_to_directory_found_file(x),
-                }
-            )
+    searching = BooleanProperty(False)
+    """
+    Whether the search is still running and new results can be added.
+
+    :attr:`searching` is an :class:`~kivy.properties.BooleanProperty`
+    and defaults to `False`.
+    """
+
+    count = NumericProperty(0)
+    """
+    Number of found files.
+
+    :attr:`count` is an :class:`~kivy.properties.NumericProperty`
+    and defaults to `0`.
+    """
+
+    page = NumericProperty(0)
+    """
+    Index of the displayed page of results.
+
+    :attr:`page` is an :class:`~kivy.properties.NumericProperty`
+    and defaults to `0`.
+    """
+
+    page_count = NumericProperty(1)
+    """
+    Number of pages of kept results.
+
+    :attr:`page_count` is an :class:`~kivy.properties.NumericProperty`
+    and defaults to `1`.
+    """
+
+    page_size = NumericProperty(100)
+    """
+    Number of results on a page.
+
+    :attr:`page_size` is an :class:`~kivy.properties.NumericProperty`
+    and defaults to `100`.
+    """
+
+    def on_pre_open(self):
+        self.update_results()
+
+    def update_results(self):
+        """Shows the current page of :attr:`results`."""
+
+        self.count = self.results.total
+        self.page_count = self.results.get_page_count(self.page_size)
+        self.page = min(self.page, self.page_count - 1)
+        color = get_hex_from_color(self.theme_cls.primary_color)
+        data = []
+        for path, detail in self.results.get_page(self.page, self.page_size):
+            name_file = os.path.basename(path)
+            item = {
+                "viewclass": "OneLineListItem",
+                "text": f"[color={color}]{name_file}[/color] {path}",
+                "on_release": lambda x=path: self.go_to_directory_found_file(x),
+            }
+            if detail:
+                # The matching line of a search in contents.
+                item.update(
+                    viewclass="TwoLineListItem",
+                    height=dp(72),
+                    secondary_text=escape_markup(detail),
+                )
+            data.append(item)
+        self.ids.rv.data = data
+
+    def set_page(self, page):
+        if 0 <= page < self.page_count:
+            self.page = page
+            self.update_results()
+            self.ids.rv.scroll_y = 1
+
+    def stop_search(self):
+        self.manager.instance_search_field.cancel_search()
+        self.searching = False
 
     def on_dismiss(self):
+        if self.searching:
+            self.stop_search()
         self.manager.dialog_files_search_results_open = False
 
     def go_to_directory_found_file(self, path_to_found_file):
@@ -426,6 +807,33 @@ class FileManagerTextFieldSearchDialog(PluginBaseDialog):
     manager = ObjectProperty()
 
 
+class FileManagerSearchOptionsDialog(PluginBaseDialog):
+    """Dialog for the exclude patterns and the maximum depth of search."""
+
+    manager = ObjectProperty()
+
+    def on_pre_open(self):
+        self.ids.field_exclude.text = self.manager.config.get(
+            "Search", "exclude"
+        )
+        max_depth = self.manager.config.getint("Search", "max_depth")
+        self.ids.field_max_depth.text = str(max_depth) if max_depth else ""
+
+    def save(self):
+        max_depth = self.ids.field_max_depth.text.strip()
+        self.manager.config.set(
+            "Search", "exclude", self.ids.field_exclude.text.strip()
+        )
+        self.manager.config.set(
+            "Search",
+            "max_depth",
+            int(max_depth) if max_depth.isdigit() else 0,
+        )
+        self.manager.config.write()
+        self.manager.on_search_rules_changed()
+        self.dismiss()
+
+
 class ContextMenuBehavior(ThemableBehavior, HoverBehavior):
     def on_enter(self):
         self.bg_color = (
@@ -538,6 +946,43 @@ class FileManager(BaseDialog):
     defaults to `''`.
     """
 
+    use_search_index = BooleanProperty(False)
+    """
+    Use a persistent filename index to answer searches by name and extension.
+    The index is stored in the cache directory of the file manager, built
+    once in the background and updated incrementally on the next openings.
+
+    :attr:`use_search_index` is an :class:`~kivy.properties.BooleanProperty`
+    and defaults to `False`.
+    """
+
+    search_index_roots = ListProperty()
+    """
+    Directories to index when :attr:`use_search_index` is `True`.
+    Searches in directories outside of these roots walk the disk as usual.
+
+    :attr:`search_index_roots` is a :class:`~kivy.properties.ListProperty`
+    and defaults to `[]`.
+    """
+
+    sort_by = OptionProperty("name", options=SORT_ORDERS)
+    """
+    Order of the files in the tabs, one of
+    :data:`~kivymd_extensions.filemanager.libs.sorting.SORT_ORDERS`.
+    The last chosen order is stored in the settings.
+
+    :attr:`sort_by` is an :class:`~kivy.properties.OptionProperty`
+    and defaults to `'name'`.
+    """
+
+    sort_reverse = BooleanProperty(False)
+    """
+    Sort the files in the descending order.
+
+    :attr:`sort_reverse` is an :class:`~kivy.properties.BooleanProperty`
+    and defaults to `False`.
+    """
+
     _overlay_color = ListProperty([0, 0, 0, 0])
 
     auto_dismiss = False
@@ -547,6 +992,8 @@ class FileManager(BaseDialog):
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
         self.ext_files = {}
+        # Sources of the icons of the skin by name, see `path_to_skin`.
+        self.skin_icons = {}
         # The object of the currently open tab.
         self.current_open_tab_manager = None
         # Open or closed the settings panel.
@@ -559,10 +1006,72 @@ class FileManager(BaseDialog):
         self.dialog_files_search_results_open = False
 
         self.instance_search_field = None
+        # <kivymd_extensions.filemanager.libs.index.FileIndex object>
+        self.search_index = None
+        # <kivymd_extensions.filemanager.libs.tasks.BackgroundTask objects>
+        # that build or refresh the search index by root.
+        self._search_index_tasks = {}
+        # Functions called by root when the running task of the root is
+        # complete.
+        self._search_index_pending = {}
+        # Changed directories by root that are indexed when the running task
+        # of the root is complete.
+        self._search_index_changes = {}
+        # <kivymd_extensions.filemanager.libs.index.FileIndex object>
+        # that is closed when its running tasks are complete.
+        self._closed_search_index = None
+        # <kivymd_extensions.filemanager.libs.searchcache.SearchCache object>
+        self.search_cache = SearchCache()
+        # <kivymd_extensions.filemanager.libs.watcher.FileWatcher object>
+        self.watcher = FileWatcher(on_change=self.on_directories_changed)
 
         self.config = ConfigParser()
         self.data_dir = os.path.join(os.path.dirname(__file__), "data")
         self.config.read(os.path.join(self.data_dir, "settings.ini"))
+        self.config.setdefaults(
+            "Search",
+            {
+                "one_filesystem": 0,
+                "skip_pseudo_filesystems": 1,
+                "use_ignore_files": 0,
+                "exclude": "",
+                "max_depth": 0,
+                "sort_by_mtime": 0,
+                "max_results": 10000,
+            },
+        )
+        self.config.setdefaults(
+            "Listing",
+            {
+                "max_directories": 64,
+                "max_entries": 200000,
+                "sort_by": "name",
+                "sort_reverse": 0,
+                "thumbnails": 1,
+            },
+        )
+        if self.config.get("Listing", "sort_by") in SORT_ORDERS:
+            self.sort_by = self.config.get("Listing", "sort_by")
+        self.sort_reverse = bool(self.config.getint("Listing", "sort_reverse"))
+        # <kivymd.uix.menu.MDDropdownMenu object>
+        self.sort_menu = None
+        # File system shared by the file choosers of all tabs.
+        # <kivymd_extensions.filemanager.libs.listing.ScandirFileSystem object>
+        self.file_system = ScandirFileSystem(
+            max_directories=self.config.getint("Listing", "max_directories"),
+            max_entries=self.config.getint("Listing", "max_entries"),
+        )
+        # <kivymd_extensions.filemanager.libs.listing.DirectoryCounter object>
+        self.directory_counter = DirectoryCounter(self.file_system)
+        # <kivymd_extensions.filemanager.libs.filetype.FileTypeDetector object>
+        self.type_detector = FileTypeDetector()
+        # Thumbnails of images shared by the file choosers of all tabs.
+        # <kivymd_extensions.filemanager.libs.thumbnails.ThumbnailLoader object>
+        self.thumbnail_loader = (
+            ThumbnailLoader()
+            if self.config.getint("Listing", "thumbnails")
+            else None
+        )
 
         self.register_event_type("on_tab_switch")
         self.register_event_type("on_tap_file")
@@ -574,11 +1083,11 @@ class FileManager(BaseDialog):
         self.theme_cls.bind(theme_style=self.update_background_search_field)
 
         if self.path_to_skin and os.path.exists(self.path_to_skin):
-            path_to_directory_exts = os.path.join(self.path_to_skin, "files")
-            for name_file in os.listdir(path_to_directory_exts):
-                self.ext_files[name_file.split(".")[0]] = os.path.join(
-                    path_to_directory_exts, name_file
-                )
+            # The icons are served from atlases of the skin directories.
+            self.skin_icons = get_skin_icons(self.path_to_skin)
+            self.ext_files = get_skin_icons(
+                os.path.join(self.path_to_skin, "files")
+            )
         if not self.ext_files:
             with open(
                 os.path.join(
@@ -719,6 +1228,75 @@ class FileManager(BaseDialog):
         tab_text = self.get_formatting_text_for_tab(os.path.split(path)[1])
         self.current_open_tab_manager.text = tab_text
 
+    def open_sort_menu(self, instance_button):
+        """Opens the menu of the orders of files."""
+
+        menu = []
+        for sort_by, text in (
+            ("name", "Name"),
+            ("natural", "Name, numbers by value"),
+            ("ext", "Extension"),
+            ("size", "Size"),
+            ("mtime", "Modification time"),
+            ("type", "Type"),
+        ):
+            menu.append(
+                {
+                    "text": f"[size=14]{text}[/size]",
+                    "viewclass": "FileManagerItem",
+                    "icon": "radiobox-marked"
+                    if sort_by == self.sort_by
+                    else "radiobox-blank",
+                    "height": dp(36),
+                    "top_pad": dp(4),
+                    "bot_pad": dp(10),
+                    "divider": None,
+                    "_txt_left_pad": dp(72),
+                    "on_release": lambda x=sort_by: self.set_sort_order(
+                        sort_by=x
+                    ),
+                }
+            )
+        menu.append(
+            {
+                "text": "[size=14]Descending[/size]",
+                "viewclass": "FileManagerItem",
+                "icon": "checkbox-marked-outline"
+                if self.sort_reverse
+                else "checkbox-blank-outline",
+                "height": dp(36),
+                "top_pad": dp(4),
+                "bot_pad": dp(10),
+                "divider": None,
+                "_txt_left_pad": dp(72),
+                "on_release": lambda: self.set_sort_order(
+                    sort_reverse=not self.sort_reverse
+                ),
+            }
+        )
+        self.sort_menu = MDDropdownMenu(
+            caller=instance_button,
+            items=menu,
+            width_mult=4,
+            background_color=self.theme_cls.bg_dark,
+        )
+        self.sort_menu.open()
+
+    def set_sort_order(self, sort_by=None, sort_reverse=None):
+        """
+        Sets the order of files in all tabs and stores it in the settings.
+        """
+
+        if self.sort_menu:
+            self.sort_menu.dismiss()
+        if sort_by is not None:
+            self.sort_by = sort_by
+        if sort_reverse is not None:
+            self.sort_reverse = sort_reverse
+        self.config.set("Listing", "sort_by", self.sort_by)
+        self.config.set("Listing", "sort_reverse", int(self.sort_reverse))
+        self.config.write()
+
     def get_formatting_text_for_tab(self, text):
         icon_font = fonts[-1]["fn_regular"]
         icon = md_icons["close"]
@@ -739,6 +1317,7 @@ class FileManager(BaseDialog):
         self._instance_file_chooser_icon = tab.ids.file_chooser_icon
         self.ids.tabs.add_widget(tab)
         self.current_open_tab_manager = tab
+        self._suspend_hidden_tabs()
         self.ids.tabs.switch_tab(tab_text, search_by="title")
         self.path = path_to_file
 
@@ -761,6 +1340,9 @@ class FileManager(BaseDialog):
 
         for instance_tab in instance_carousel.slides:
             if instance_tab.text == instance_tab_label.text:
+                instance_tab.unwatch_directories()
+                instance_tab.ids.file_chooser_icon.stop_loading()
+                instance_tab.ids.file_chooser_list.stop_loading()
                 instance_tabs.remove_widget(instance_tab_label)
                 break
 
@@ -784,6 +1366,13 @@ class FileManager(BaseDialog):
                     )
                 )
         self.ids.header_box_menu.add_widget(MDSeparator(orientation="vertical"))
+        self.ids.header_box_menu.add_widget(
+            MDIconButton(
+                icon="sort",
+                user_font_size="18sp",
+                on_release=self.open_sort_menu,
+            )
+        )
         self.ids.header_box_menu.add_widget(
             MDIconButton(
                 icon="cog",
@@ -816,11 +1405,23 @@ class FileManager(BaseDialog):
         self.instance_search_field.background_active = background_normal
 
     def open_context_menu(self, entry_object, type_chooser):
-        """Opens a context menu on right-clicking on a file or folder."""
+        """
+        Opens a context menu on right-clicking on a file or folder.
 
+        :param entry_object: the clicked view or a
+                             :class:`~kivymd_extensions.filemanager.libs.plugins.contextmenu.ContextMenuEntry`
+                             object.
+        """
+
+        if not isinstance(entry_object, ContextMenuEntry):
+            entry_object = ContextMenuEntry(entry_object.path, entry_object)
         menu = MDDropdownMenu(
-            caller=entry_object,
-            items=self.get_menu_right_click(entry_object, type_chooser),
+            caller=entry_object.view,
+            # The path is taken now, the view may show another file when an
+            # item of the menu is chosen.
+            items=self.get_menu_right_click(
+                ContextMenuEntry(entry_object.path), type_chooser
+            ),
             width_mult=4,
             background_color=self.theme_cls.bg_dark,
             max_height=dp(240),
@@ -837,26 +1438,32 @@ class FileManager(BaseDialog):
         type_click = touch[0][1].button
         # "FileChooserList" or "FileChooserIcon".
         type_chooser = touch[1]
-        # FileThumbEntry object from file_chooser_icon.py file.
+        # FileThumbEntry object from file_chooser_icon.py file or a
+        # ContextMenuEntry object.
         entry_object = touch[0][0]
+        if isinstance(entry_object, ContextMenuEntry):
+            view = entry_object.view
+        else:
+            view = entry_object
+        path = entry_object.path
 
-        if type_click == "right" and entry_object.path != "../":
-            self.open_context_menu(entry_object, type_chooser)
+        if type_click == "right" and path != "../":
+            self.open_context_menu(ContextMenuEntry(path, view), type_chooser)
         else:
-            if entry_object.path == "../":
-                entry_object.path = os.path.dirname(self.path)
-            entry_object.collide_point(
+            if path == "../":
+                path = os.path.dirname(self.path)
+            view is not None and view.collide_point(
                 *touch[0][1].pos
             ) and self._instance_file_chooser_icon.entry_touched(
-                entry_object, touch[0][1]
+                ContextMenuEntry(path), touch[0][1]
             )
-            if os.path.isdir(entry_object.path):
-                self.set_path(entry_object.path)
-                self.dispatch("on_tap_dir", entry_object.path)
+            if os.path.isdir(path):
+                self.set_path(path)
+                self.dispatch("on_tap_dir", path)
             else:
-                self.dispatch("on_tap_file", entry_object.path)
-        if hasattr(entry_object, "remove_tooltip"):
-            entry_object.remove_tooltip()
+                self.dispatch("on_tap_file", path)
+        if hasattr(view, "remove_tooltip"):
+            view.remove_tooltip()
 
     def call_context_menu_plugin(self, name_plugin, entry_object):
         module = importlib.import_module(
@@ -870,7 +1477,7 @@ class FileManager(BaseDialog):
 
     def tap_to_context_menu_item(self, text_item, entry_object):
         """
-        :type entry_object:  <kivy.lang.builder.FileThumbEntry object>
+        :type entry_object:  <kivymd_extensions.filemanager.libs.plugins.contextmenu.ContextMenuEntry object>
         :type instance_item: <kivymd.uix.menu.MDMenuItemIcon object>
         :type instance_menu: <kivymd.uix.menu.MDDropdownMenu object>
         """
@@ -950,24 +1557,172 @@ class FileManager(BaseDialog):
             )
         return menu_right_click_items
 
-    def get_icon_file(self, path_to_file):
-        """Method that returns the icon path for the file."""
+    def get_icon_file(self, path_to_file, extension=None):
+        """
+        Method that returns the icon path for the file. `extension` is the
+        extension of the type of the file if it was detected by contents.
+        """
 
+        if extension is None:
+            extension = os.path.splitext(path_to_file)[1].replace(".", "")
         return self.ext_files.get(
-            os.path.splitext(path_to_file)[1].replace(".", ""),
-            os.path.join(self.path_to_skin, "file.png")
-            if self.path_to_skin
-            else "file-outline",
+            extension, self.skin_icons.get("file", "file-outline")
         )
 
-    def update_files(self, instance_pludin_dialog, path):
-        # FIXME: Unable to update directory. You have to go to a higher level
-        #  and go back.
-        self.set_path(os.getcwd())
-        self.set_path(os.path.dirname(path))
+    def get_file_type(self, path_to_file):
+        """
+        Returns the MIME type of the file, which is detected by contents if
+        the name of the file does not tell it, or an empty string.
+        """
+
+        extension = os.path.splitext(path_to_file)[1].lower()
+        if needs_sniffing(path_to_file):
+            extension = "." + self.type_detector.get_type(path_to_file)
+        return get_type(extension)
+
+    def get_folder_icon(self):
+        """Method that returns the icon path for directories."""
+
+        return self.skin_icons.get("folder", "folder")
+
+    def refresh_paths(self, paths):
+        """
+        Updates the entries of the `paths` files in all tabs after they were
+        created, renamed or removed. Only these entries are changed, the
+        directories are not read again.
+        """
+
+        paths = [os.path.abspath(path) for path in paths]
+        if not paths:
+            return
+        is_dir = self.file_system.is_dir
+        # The tree only shows directories.
+        has_dirs = any(is_dir(path) for path in paths)
+        self.file_system.update_records(paths)
+        has_dirs = has_dirs or any(is_dir(path) for path in paths)
+        for tab in self.ids.tabs.get_slides():
+            tab.ids.file_chooser_icon.update_entries(paths)
+            if has_dirs:
+                # Only the shown directories are read again.
+                tab.ids.file_chooser_list.update_directories(
+                    {os.path.dirname(path) for path in paths}
+                )
+
+    def build_search_index(self, root):
+        """
+        Indexes the `root` directory from scratch in the background. A
+        running build or refresh of the root is canceled first.
+        """
+
+        if not self.search_index:
+            return
+        root = os.path.abspath(root)
+        self._run_search_index_task(
+            root,
+            lambda: self._start_search_index_task(
+                self.search_index.build, root
+            ),
+        )
+
+    def refresh_search_index(self, root):
+        """
+        Updates the index of the `root` directory in the background,
+        rescanning only the directories that have changed. Nothing is done
+        if the root is already being indexed.
+        """
+
+        if not self.search_index:
+            return
+        root = os.path.abspath(root)
+        if root in self._search_index_tasks:
+            return
+        self._start_search_index_task(self.search_index.refresh, root)
+
+    def drop_search_index(self, root):
+        """
+        Removes the `root` directory from the search index, after a running
+        build or refresh of the root is canceled.
+        """
+
+        if not self.search_index:
+            return
+        root = os.path.abspath(root)
+        self._run_search_index_task(root, lambda: self.search_index.drop(root))
+
+    def get_search_result_store(self, query):
+        """
+        Returns an empty
+        :class:`~kivymd_extensions.filemanager.libs.results.ResultStore`
+        object that ranks the files found by `query` according to
+        the `Search` section of settings.
+        """
+
+        if self.config.getint("Search", "sort_by_mtime"):
+            key = get_mtime
+        elif query.type == "content":
+            key = None
+        else:
+            key = lambda path: query.score(os.path.basename(path))
+        return ResultStore(
+            limit=self.config.getint("Search", "max_results"), key=key
+        )
+
+    def on_search_rules_changed(self):
+        """
+        Called when the options of the `Search` section of settings change.
+        Forgets the cached searches and builds the indexed roots again with
+        the new rules.
+        """
+
+        self.search_cache.clear()
+        if not self.search_index:
+            return
+        for root in self.search_index.roots():
+            # A pending build uses the new rules, a pending drop is kept.
+            if root not in self._search_index_pending:
+                self.build_search_index(root)
+
+    def close_search_index(self):
+        """
+        Closes the search index. The running tasks of the index are canceled
+        and the database is closed when they are complete.
+        """
+
+        search_index, self.search_index = self.search_index, None
+        if not search_index:
+            return
+        self._search_index_pending.clear()
+        self._search_index_changes.clear()
+        if self._search_index_tasks:
+            for task in self._search_index_tasks.values():
+                task.cancel()
+            self._closed_search_index = search_index
+        else:
+            search_index.close()
+
+    def get_search_rules(self):
+        """
+        Returns a :class:`~kivymd_extensions.filemanager.libs.walker.PruneRules`
+        object with the options of the `Search` section of settings.
+        """
+
+        max_depth = self.config.getint("Search", "max_depth")
+        return PruneRules(
+            one_filesystem=self.config.getint("Search", "one_filesystem"),
+            skip_pseudo_filesystems=self.config.getint(
+                "Search", "skip_pseudo_filesystems"
+            ),
+            exclude=[
+                pattern.strip()
+                for pattern in self.config.get("Search", "exclude").split(",")
+                if pattern.strip()
+            ],
+            max_depth=max_depth if max_depth > 0 else None,
+            use_ignore_files=self.config.getint("Search", "use_ignore_files"),
+        )
 
     def is_dir(self, directory, filename):
-        return os.path.isdir(os.path.join(directory, filename))
+        return self.file_system.is_dir(os.path.join(directory, filename))
 
     def on_tap_file(self, *args):
         """Called when the file is clicked."""
@@ -993,15 +1748,37 @@ class FileManager(BaseDialog):
     def on_open(self):
         """Called when the ModalView is opened."""
 
+        # Tabs left from the previous opening.
+        for tab in self.ids.tabs.get_slides():
+            tab.watch_directories()
         self.add_tab(self.path)
         self.create_header_menu()
         self.apply_palette()
         self.add_color_panel()
+        if self.use_search_index:
+            if not self.search_index:
+                self.search_index = FileIndex(
+                    os.path.join(get_cache_directory(), "search_index.db")
+                )
+            for root in self.search_index_roots:
+                self.refresh_search_index(root)
+
+    def on_dismiss(self):
+        self.watcher.stop()
+        for tab in self.ids.tabs.get_slides():
+            tab.ids.file_chooser_icon.stop_loading()
+            tab.ids.file_chooser_list.stop_loading()
+        if self.thumbnail_loader:
+            self.thumbnail_loader.stop()
+        self.type_detector.stop()
+        self.directory_counter.stop()
+        self.close_search_index()
 
     def _on_tab_switch(
         self, instance_tabs, instance_tab, instance_tab_label, tab_text
     ):
         self.current_open_tab_manager = instance_tab
+        self._suspend_hidden_tabs()
         self.dispatch(
             "on_tab_switch",
             instance_tabs,
@@ -1010,5 +1787,90 @@ class FileManager(BaseDialog):
             tab_text,
         )
 
+    def _suspend_hidden_tabs(self):
+        # Only the entries of the shown tab are kept.
+        for tab in self.ids.tabs.get_slides():
+            if tab is self.current_open_tab_manager:
+                tab.resume()
+            else:
+                tab.suspend()
+
+    def on_directories_changed(self, instance_watcher, paths):
+        """
+        Called with the paths to the watched directories that have changed.
+        Forgets their cached listings and brings the search index up to date
+        for these directories.
+        """
+
+        for path in paths:
+            self.file_system.invalidate(path)
+        if not self.search_index:
+            return
+        rules = self.get_search_rules()
+        for path in paths:
+            root = self.search_index.get_root(path, rules)
+            if root:
+                self._search_index_changes.setdefault(root, set()).add(path)
+        for root in list(self._search_index_changes):
+            # The changes of a root that is being indexed wait for its task.
+            if root not in self._search_index_tasks:
+                self._start_search_index_update(root)
+
+    def _start_search_index_update(self, root):
+        paths = self._search_index_changes.pop(root)
+        self._search_index_tasks[root] = BackgroundTask(
+            target=self._update_search_index,
+            args=(self.search_index, root, paths),
+            on_complete=lambda task: self._on_search_index_task_complete(
+                task, root
+            ),
+        ).start()
+
+    def _update_search_index(self, task, search_index, root, paths):
+        rules = self.get_search_rules().prepare(root)
+        for path in paths:
+            if task.canceled:
+                break
+            search_index.update_directory(
+                root, path, canceled=lambda: task.canceled, rules=rules
+            )
+
+    def _run_search_index_task(self, root, function):
+        # Calls `function` now or, if the root is being indexed, when the
+        # canceled task is complete, so the tasks never write the same root
+        # at the same time.
+        task = self._search_index_tasks.get(root)
+        if task:
+            task.cancel()
+            self._search_index_pending[root] = function
+        else:
+            function()
+
+    def _start_search_index_task(self, method, root):
+        self._search_index_tasks[root] = BackgroundTask(
+            target=lambda task: method(
+                root,
+                canceled=lambda: task.canceled,
+                rules=self.get_search_rules(),
+            ),
+            on_complete=lambda task: self._on_search_index_task_complete(
+                task, root
+            ),
+        ).start()
+
+    def _on_search_index_task_complete(self, task, root):
+        if self._search_index_tasks.get(root) is task:
+            del self._search_index_tasks[root]
+            function = self._search_index_pending.pop(root, None)
+            if function:
+                # A build or a drop of the root makes the changes obsolete.
+                self._search_index_changes.pop(root, None)
+                function()
+            elif root in self._search_index_changes:
+                self._start_search_index_update(root)
+        if self._closed_search_index and not self._search_index_tasks:
+            self._closed_search_index.close()
+            self._closed_search_index = None
+
     def _set_state_close_theme_panel(self, *args):
         self.settings_theme_panel_open = False
@@ -0,0 +1,170 @@
+"""
+Detection of file types by contents.
+
+Files without an extension, or with an extension that says nothing about
+their contents, are recognized by the signatures at the start of the file.
+The detected types are remembered by the device, inode and modification
+time of the file, so a file is read only once until it is changed:
+
+.. code-block:: python
+
+    detector = FileTypeDetector()
+    detector.get_type("/home/user/download")  # "pdf"
+    future = detector.request("/home/user/image", lambda ext: print(ext))
+"""
+
+import collections
+import os
+import re
+import stat
+import threading
+
+from kivymd_extensions.filemanager.libs.tasks import BackgroundExecutor
+
+# Extensions that are given to files of any type.
+AMBIGUOUS_EXTENSIONS = {
+    "bak",
+    "bin",
+    "dat",
+    "data",
+    "download",
+    "old",
+    "part",
+    "tmp",
+}
+# Number of bytes read from the start of a file.
+SNIFF_SIZE = 512
+# `(extension, ((offset, signature), ...))` tuples, a file has the type of
+# the first tuple whose signatures are all found at their offsets.
+SIGNATURES = (
+    ("png", ((0, b"\x89PNG\r\n\x1a\n"),)),
+    ("jpg", ((0, b"\xff\xd8\xff"),)),
+    ("gif", ((0, b"GIF87a"),)),
+    ("gif", ((0, b"GIF89a"),)),
+    ("webp", ((0, b"RIFF"), (8, b"WEBP"))),
+    ("avi", ((0, b"RIFF"), (8, b"AVI "))),
+    ("wav", ((0, b"RIFF"), (8, b"WAVE"))),
+    ("bmp", ((0, b"BM"),)),
+    ("pdf", ((0, b"%PDF-"),)),
+    ("zip", ((0, b"PK\x03\x04"),)),
+    ("zip", ((0, b"PK\x05\x06"),)),
+    ("gz", ((0, b"\x1f\x8b"),)),
+    ("bz2", ((0, b"BZh"),)),
+    ("xz", ((0, b"\xfd7zXZ\x00"),)),
+    ("7z", ((0, b"7z\xbc\xaf\x27\x1c"),)),
+    ("rar", ((0, b"Rar!\x1a\x07"),)),
+    ("tar", ((257, b"ustar"),)),
+    ("ogg", ((0, b"OggS"),)),
+    ("flac", ((0, b"fLaC"),)),
+    ("mp3", ((0, b"ID3"),)),
+    ("mp3", ((0, b"\xff\xfb"),)),
+    ("mp4", ((4, b"ftyp"),)),
+    ("doc", ((0, b"\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1"),)),
+    ("rtf", ((0, b"{\\rtf"),)),
+    ("sqlite", ((0, b"SQLite format 3\x00"),)),
+    ("xml", ((0, b"<?xml"),)),
+)
+# Extensions of scripts by interpreter.
+INTERPRETERS = {
+    "bash": "sh",
+    "node": "js",
+    "perl": "pl",
+    "python": "py",
+    "ruby": "rb",
+    "sh": "sh",
+}
+
+_INTERPRETER = re.compile(rb"#!\s*(?:\S*/)?([a-z]+)[\d.]*(?:\s+([a-z]+))?")
+
+
+def needs_sniffing(name):
+    """Whether the type of the `name` file is not known from its name."""
+
+    extension = os.path.splitext(name)[1][1:].lower()
+    return not extension or extension in AMBIGUOUS_EXTENSIONS
+
+
+def sniff_type(path):
+    """
+    Returns the extension of the type of the `path` file detected by its
+    contents, or an empty string if the type is not recognized or the file
+    cannot be read.
+    """
+
+    try:
+        with open(path, "rb") as file:
+            header = file.read(SNIFF_SIZE)
+    except OSError:
+        return ""
+    for extension, signatures in SIGNATURES:
+        if all(
+            header.startswith(signature, offset)
+            for offset, signature in signatures
+        ):
+            return extension
+    match = _INTERPRETER.match(header)
+    if match:
+        # For `#!/usr/bin/env python3` the interpreter is the argument.
+        interpreter = match.group(1)
+        if interpreter == b"env" and match.group(2):
+            interpreter = match.group(2)
+        return INTERPRETERS.get(interpreter.decode("ascii"), "")
+    return ""
+
+
+class FileTypeDetector:
+    """
+    Detects the types of files by contents and remembers them.
+
+    :param max_entries: the number of remembered types.
+    """
+
+    def __init__(self, max_entries=65536):
+        self.max_entries = max_entries
+        # Extensions by `(st_dev, st_ino, st_mtime_ns)`.
+        self._types = collections.OrderedDict()
+        # <kivymd_extensions.filemanager.libs.tasks.BackgroundExecutor object>
+        self._executor = BackgroundExecutor()
+        self._lock = threading.Lock()
+
+    def get_type(self, path):
+        """
+        Returns the extension of the type of the `path` file, see
+        :func:`sniff_type`.
+        """
+
+        try:
+            st = os.stat(path)
+        except OSError:
+            return ""
+        if not stat.S_ISREG(st.st_mode):
+            return ""
+        key = (st.st_dev, st.st_ino, st.st_mtime_ns)
+        with self._lock:
+            extension = self._types.get(key)
+            if extension is not None:
+                self._types.move_to_end(key)
+                return extension
+        extension = sniff_type(path)
+        with self._lock:
+            self._types[key] = extension
+            while len(self._types) > self.max_entries:
+                self._types.popitem(last=False)
+        return extension
+
+    def request(self, path, callback):
+        """
+        Detects the type of the `path` file on a background thread and calls
+        `callback(extension)` on the main thread. Returns a
+        :class:`concurrent.futures.Future` object, the callback is not
+        called if it is canceled.
+        """
+
+        return self._executor.submit(
+            lambda future: callback(future.result()), self.get_type, path
+        )
+
+    def stop(self):
+        """Cancels the requests that are not started yet."""
+
+        self._executor.stop()
@@ -0,0 +1,206 @@
+"""
+Search of text in the contents of files.
+
+Files are read through :mod:`mmap` (small files with a single read), binary
+files are skipped and, on Linux, the files are matched on a pool of
+processes, so the search is not limited by the GIL:
+
+.. code-block:: python
+
+    search = ContentSearch("listen_port")
+    walker = TreeWalker("/etc")
+    for path, matches in search.search(batch_paths(walker.walk())):
+        for line_number, line in matches:
+            print(f"{path}:{line_number}: {line}")
+"""
+
+import concurrent.futures
+import mmap
+import multiprocessing
+import os
+import re
+import stat
+from concurrent.futures.process import BrokenProcessPool
+
+from kivy.utils import platform
+
+# Number of bytes at the beginning of a file checked for binary data.
+BINARY_SNIFF_SIZE = 8192
+# Files larger than this size in bytes are mapped into memory.
+MMAP_THRESHOLD = 64 * 1024
+MAX_MATCHES_PER_FILE = 100
+MAX_LINE_LENGTH = 200
+# Number of files matched by one task of the pool.
+BATCH_SIZE = 64
+
+
+def is_binary(data):
+    """Returns True if the beginning of the file `data` is not text."""
+
+    return b"\0" in data[:BINARY_SNIFF_SIZE]
+
+
+def grep_file(path, pattern, max_matches=MAX_MATCHES_PER_FILE):
+    """
+    Returns a list of `(line_number, line)` tuples for the lines of the
+    `path` file that match the `pattern` bytes regular expression.
+    """
+
+    try:
+        # Reading a pipe or a device could block forever.
+        if not stat.S_ISREG(os.stat(path).st_mode):
+            return []
+        with open(path, "rb") as file:
+            size = os.fstat(file.fileno()).st_size
+            if not size:
+                return []
+            if size < MMAP_THRESHOLD:
+                data = file.read()
+            else:
+                data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+            try:
+                return _find_lines(data, pattern, max_matches)
+            finally:
+                if isinstance(data, mmap.mmap):
+                    data.close()
+    except (OSError, ValueError):
+        return []
+
+
+def grep_files(paths, pattern, max_matches=MAX_MATCHES_PER_FILE):
+    """
+    Returns a list of `(path, matches)` tuples for the files that contain
+    `pattern`, see :func:`grep_file`. Runs in the processes of the pool.
+    """
+
+    results = []
+    for path in paths:
+        matches = grep_file(path, pattern, max_matches)
+        if matches:
+            results.append((path, matches))
+    return results
+
+
+def batch_paths(walk, size=BATCH_SIZE):
+    """
+    Groups the `(directory, names)` tuples of a walk into lists of `size`
+    paths.
+    """
+
+    batch = []
+    for directory, names in walk:
+        for name in names:
+            batch.append(os.path.join(directory, name))
+            if len(batch) >= size:
+                yield batch
+                batch = []
+    if batch:
+        yield batch
+
+
+class ContentSearch:
+    """
+    Case-insensitive search of `text` in the contents of files.
+
+    :param workers: number of processes, the number of CPUs by default.
+    """
+
+    type = "content"
+
+    def __init__(self, text, workers=None):
+        self.text = text
+        self.workers = workers or os.cpu_count() or 1
+        self.pattern = re.compile(
+            re.escape(text.encode("utf-8")), re.IGNORECASE
+        )
+
+    def search(self, batches, canceled=None):
+        """
+        Generator of `(path, matches)` tuples for the files that contain
+        the text, in the order in which they are matched.
+
+        :param batches: an iterable of lists of paths, see
+                        :func:`batch_paths`.
+        :param canceled: a callable, when it returns True the search is
+                         stopped.
+        """
+
+        executor = self._create_executor()
+        pending = set()
+        try:
+            for batch in batches:
+                if canceled and canceled():
+                    return
+                pending.add(executor.submit(grep_files, batch, self.pattern))
+                # Limits the number of batches waiting for a worker.
+                if len(pending) >= self.workers * 2:
+                    done, pending = concurrent.futures.wait(
+                        pending, return_when=concurrent.futures.FIRST_COMPLETED
+                    )
+                    yield from self._get_results(done)
+            while pending:
+                if canceled and canceled():
+                    return
+                done, pending = concurrent.futures.wait(
+                    pending,
+                    timeout=0.1,
+                    return_when=concurrent.futures.FIRST_COMPLETED,
+                )
+                yield from self._get_results(done)
+        finally:
+            for future in pending:
+                future.cancel()
+            executor.shutdown(wait=False)
+
+    def _create_executor(self):
+        # Worker processes are forked, a spawned process would import the
+        # application with its window. Forking a process with threads is
+        # only safe enough on Linux, threads are used everywhere else and
+        # where a pool of processes cannot be created.
+        if platform == "linux":
+            try:
+                return concurrent.futures.ProcessPoolExecutor(
+                    self.workers, mp_context=multiprocessing.get_context("fork")
+                )
+            except (
+                ImportError,
+                NotImplementedError,
+                OSError,
+                TypeError,
+                ValueError,
+            ):
+                # `mp_context` needs Python 3.7, semaphores are missing on
+                # some systems.
+                pass
+        return concurrent.futures.ThreadPoolExecutor(self.workers)
+
+    def _get_results(self, futures):
+        for future in futures:
+            try:
+                yield from future.result()
+            except (BrokenProcessPool, concurrent.futures.CancelledError):
+                continue
+
+
+def _find_lines(data, pattern, max_matches):
+    if is_binary(data[:BINARY_SNIFF_SIZE]):
+        return []
+    matches = []
+    line_number = 1
+    position = 0
+    for match in pattern.finditer(data):
+        start = match.start()
+        if start < position:
+            # The line is already reported.
+            continue
+        line_number += data[position:start].count(b"\n")
+        line_start = data.rfind(b"\n", 0, start) + 1
+        line_end = data.find(b"\n", start)
+        if line_end == -1:
+            line_end = len(data)
+        line = data[line_start : min(line_end, line_start + MAX_LINE_LENGTH)]
+        matches.append((line_number, line.decode("utf-8", "replace").strip()))
+        if len(matches) >= max_matches:
+            break
+        position = line_end
+    return matches
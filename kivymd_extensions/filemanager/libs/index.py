@@ -0,0 +1,383 @@
+"""
+Persistent filename index for the search field of the file manager.
+
+The index is kept in an SQLite database. For every indexed root it stores the
+names of the files and the modification times of the directories, so that
+the index can be refreshed incrementally by rescanning only the directories
+that have changed since the last pass. A root is also stored with the prune
+rules it was built with, it is rebuilt when the rules change.
+
+.. code-block:: python
+
+    index = FileIndex("path/to/index.db")
+    index.build("/home/user")
+    index.search("/home/user/projects", Query("report", "name"))
+    index.refresh("/home/user")
+    index.drop("/home/user")
+"""
+
+import os
+import sqlite3
+import threading
+import time
+
+# Number of directories written to the database in one transaction.
+BATCH_SIZE = 256
+
+# Version of the tables, the index is rebuilt when it changes.
+SCHEMA_VERSION = 4
+
+
+class FileIndex:
+    """SQLite index of file names by root directory."""
+
+    def __init__(self, path_to_database):
+        self.path_to_database = path_to_database
+        # Whether the SQLite build supports the FTS5 trigram tokenizer.
+        self.use_trigrams = False
+        self._lock = threading.RLock()
+        self._connection = sqlite3.connect(
+            path_to_database, check_same_thread=False
+        )
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        self._create_tables()
+
+    def build(self, root, canceled=None, rules=None):
+        """
+        Indexes all files in the `root` directory from scratch.
+
+        :param canceled: a callable, when it returns True the build is stopped.
+        :param rules: a
+                      :class:`~kivymd_extensions.filemanager.libs.walker.PruneRules`
+                      object, the `.gitignore`-style files are not used.
+        """
+
+        root = os.path.abspath(root)
+        if rules:
+            rules.prepare(root)
+        self.drop(root)
+        with self._lock, self._connection:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO roots(root, built, rules) "
+                "VALUES (?, NULL, ?)",
+                (root, self._get_rules_key(rules)),
+            )
+        if not self._scan_tree(root, root, canceled, rules):
+            return False
+        with self._lock, self._connection:
+            self._connection.execute(
+                "UPDATE roots SET built = ? WHERE root = ?", (time.time(), root)
+            )
+        return True
+
+    def refresh(self, root, canceled=None, rules=None):
+        """
+        Brings the index of the `root` directory up to date.
+
+        Only directories whose modification time has changed are rescanned.
+        If the root has not been indexed yet or was indexed with other
+        `rules`, it is built from scratch.
+        """
+
+        root = os.path.abspath(root)
+        if not self.is_built(root, rules):
+            return self.build(root, canceled, rules)
+        if rules:
+            rules.prepare(root)
+        with self._lock:
+            known_dirs = dict(
+                self._connection.execute(
+                    "SELECT path, mtime FROM dirs WHERE root = ?", (root,)
+                ).fetchall()
+            )
+        for path, mtime in known_dirs.items():
+            if canceled and canceled():
+                return False
+            try:
+                current_mtime = os.stat(path).st_mtime_ns
+            except OSError:
+                self._delete_tree(root, path)
+                continue
+            if current_mtime != mtime:
+                self.update_directory(root, path, known_dirs, canceled, rules)
+        with self._lock, self._connection:
+            self._connection.execute(
+                "UPDATE roots SET built = ? WHERE root = ?", (time.time(), root)
+            )
+        return True
+
+    def update_directory(
+        self, root, path, known_dirs=None, canceled=None, rules=None
+    ):
+        """
+        Rescans the files of the `path` directory and indexes any of its
+        subdirectories that are not yet in the index.
+        """
+
+        if known_dirs is None:
+            with self._lock:
+                known_dirs = dict(
+                    self._connection.execute(
+                        "SELECT path, mtime FROM dirs WHERE root = ?", (root,)
+                    ).fetchall()
+                )
+        depth = self._get_depth(root, path)
+        listing = self._scan_directory(path, depth, rules)
+        if listing is None:
+            self._delete_tree(root, path)
+            return
+        mtime, files, dirs = listing
+        self._write([(path, mtime, files)], root, replace=True)
+        for directory in dirs:
+            if directory not in known_dirs:
+                self._scan_tree(root, directory, canceled, rules, depth + 1)
+
+    def drop(self, root):
+        """Removes the `root` directory and all its files from the index."""
+
+        root = os.path.abspath(root)
+        with self._lock, self._connection:
+            self._connection.execute(
+                "DELETE FROM files WHERE root = ?", (root,)
+            )
+            self._connection.execute("DELETE FROM dirs WHERE root = ?", (root,))
+            self._connection.execute(
+                "DELETE FROM roots WHERE root = ?", (root,)
+            )
+
+    def roots(self, rules=None):
+        """
+        Returns a list of the indexed root directories, only of those indexed
+        with `rules` if they are given.
+        """
+
+        with self._lock:
+            return [
+                root
+                for root, rules_key in self._connection.execute(
+                    "SELECT root, rules FROM roots WHERE built IS NOT NULL"
+                )
+                if rules is None or rules_key == self._get_rules_key(rules)
+            ]
+
+    def is_built(self, root, rules=None):
+        return os.path.abspath(root) in self.roots(rules)
+
+    def get_root(self, path, rules=None):
+        """
+        Returns the indexed root that contains `path` or None, see
+        :meth:`roots`.
+        """
+
+        path = os.path.abspath(path)
+        for root in sorted(self.roots(rules), key=len, reverse=True):
+            if path == root or path.startswith(root.rstrip(os.sep) + os.sep):
+                return root
+
+    def search(self, path, query, rules=None):
+        """
+        Returns a list of paths to the files in the `path` directory and its
+        subdirectories whose names match the
+        :class:`~kivymd_extensions.filemanager.libs.query.Query` object.
+        Only a root indexed with `rules` is searched if they are given.
+        """
+
+        path = os.path.abspath(path)
+        root = self.get_root(path, rules)
+        if root is None or not query.text:
+            return []
+
+        conditions = ["f.root = ?"]
+        parameters = [root]
+        if path != root:
+            prefix = path.rstrip(os.sep) + os.sep
+            conditions.append("(f.dir = ? OR substr(f.dir, 1, ?) = ?)")
+            parameters.extend([path, len(prefix), prefix])
+
+        # The SQL condition only narrows down the candidates,
+        # the names are checked by the query itself.
+        like_pattern = query.like_pattern()
+        if query.extension and "." not in query.extension:
+            conditions.append("f.ext = ?")
+            parameters.append(query.extension.lower())
+            sql = "SELECT f.dir, f.name FROM files f WHERE "
+        elif like_pattern and self.use_trigrams:
+            sql = (
+                "SELECT f.dir, f.name FROM names "
+                "JOIN files f ON f.id = names.rowid WHERE names.name LIKE ? "
+                "AND "
+            )
+            parameters.insert(0, like_pattern)
+        elif like_pattern:
+            sql = "SELECT f.dir, f.name FROM files f WHERE f.name LIKE ? AND "
+            parameters.insert(0, like_pattern)
+        else:
+            sql = "SELECT f.dir, f.name FROM files f WHERE "
+        sql += " AND ".join(conditions)
+
+        match = query.match
+        with self._lock:
+            rows = self._connection.execute(sql, parameters).fetchall()
+        return [os.path.join(d, name) for d, name in rows if match(name)]
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
+
+    def _create_tables(self):
+        with self._lock, self._connection:
+            version = self._connection.execute(
+                "PRAGMA user_version"
+            ).fetchone()[0]
+            if version != SCHEMA_VERSION:
+                self._connection.executescript(
+                    """
+                    DROP TABLE IF EXISTS names;
+                    DROP TABLE IF EXISTS files;
+                    DROP TABLE IF EXISTS dirs;
+                    DROP TABLE IF EXISTS roots;
+                    """
+                )
+                self._connection.execute(
+                    f"PRAGMA user_version = {SCHEMA_VERSION}"
+                )
+            self._connection.executescript(
+                """
+                CREATE TABLE IF NOT EXISTS roots(
+                    root TEXT PRIMARY KEY,
+                    built REAL,
+                    rules TEXT NOT NULL
+                );
+                CREATE TABLE IF NOT EXISTS dirs(
+                    root TEXT NOT NULL,
+                    path TEXT NOT NULL,
+                    mtime INTEGER NOT NULL,
+                    PRIMARY KEY(root, path)
+                );
+                CREATE TABLE IF NOT EXISTS files(
+                    id INTEGER PRIMARY KEY,
+                    root TEXT NOT NULL,
+                    dir TEXT NOT NULL,
+                    name TEXT NOT NULL,
+                    ext TEXT NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS files_root_dir ON files(root, dir);
+                CREATE INDEX IF NOT EXISTS files_root_ext ON files(root, ext);
+                """
+            )
+            try:
+                self._connection.executescript(
+                    """
+                    CREATE VIRTUAL TABLE IF NOT EXISTS names USING fts5(
+                        name,
+                        content='files',
+                        content_rowid='id',
+                        tokenize='trigram'
+                    );
+                    CREATE TRIGGER IF NOT EXISTS files_insert
+                    AFTER INSERT ON files BEGIN
+                        INSERT INTO names(rowid, name)
+                        VALUES (new.id, new.name);
+                    END;
+                    CREATE TRIGGER IF NOT EXISTS files_delete
+                    AFTER DELETE ON files BEGIN
+                        INSERT INTO names(names, rowid, name)
+                        VALUES ('delete', old.id, old.name);
+                    END;
+                    """
+                )
+                self.use_trigrams = True
+            except sqlite3.OperationalError:
+                # SQLite was built without FTS5 or without the trigram
+                # tokenizer. Names are then matched by scanning the table.
+                self.use_trigrams = False
+
+    def _scan_directory(self, path, depth=0, rules=None):
+        """
+        Returns a tuple of the modification time, the names of the files and
+        the paths to the subdirectories of the `path` directory.
+        """
+
+        files = []
+        dirs = []
+        try:
+            mtime = os.stat(path).st_mtime_ns
+            with os.scandir(path) as entries:
+                for entry in entries:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            if not (
+                                rules and rules.skip_directory(entry, depth + 1)
+                            ):
+                                dirs.append(entry.path)
+                        elif not (rules and rules.skip_file(entry)):
+                            files.append(entry.name)
+                    except OSError:
+                        continue
+        except OSError:
+            return None
+        return mtime, files, dirs
+
+    def _scan_tree(self, root, path, canceled=None, rules=None, depth=0):
+        batch = []
+        stack = [(path, depth)]
+        while stack:
+            if canceled and canceled():
+                return False
+            directory, depth = stack.pop()
+            listing = self._scan_directory(directory, depth, rules)
+            if listing is None:
+                continue
+            mtime, files, dirs = listing
+            stack.extend((subdirectory, depth + 1) for subdirectory in dirs)
+            batch.append((directory, mtime, files))
+            if len(batch) >= BATCH_SIZE:
+                self._write(batch, root)
+                batch = []
+        self._write(batch, root)
+        return True
+
+    def _write(self, batch, root, replace=False):
+        with self._lock, self._connection:
+            for directory, mtime, files in batch:
+                if replace:
+                    self._connection.execute(
+                        "DELETE FROM files WHERE root = ? AND dir = ?",
+                        (root, directory),
+                    )
+                self._connection.execute(
+                    "INSERT OR REPLACE INTO dirs(path, root, mtime) "
+                    "VALUES (?, ?, ?)",
+                    (directory, root, mtime),
+                )
+                self._connection.executemany(
+                    "INSERT INTO files(root, dir, name, ext) VALUES (?, ?, ?, ?)",
+                    [
+                        (
+                            root,
+                            directory,
+                            name,
+                            os.path.splitext(name)[1][1:].lower(),
+                        )
+                        for name in files
+                    ],
+                )
+
+    def _get_rules_key(self, rules):
+        return rules.get_key() if rules else ""
+
+    def _get_depth(self, root, path):
+        relative_path = os.path.relpath(path, root)
+        return 0 if relative_path == "." else relative_path.count(os.sep) + 1
+
+    def _delete_tree(self, root, path):
+        # Only the rows of `root`, the directory may be in other roots too.
+        prefix = path.rstrip(os.sep) + os.sep
+        with self._lock, self._connection:
+            for table, column in (("files", "dir"), ("dirs", "path")):
+                self._connection.execute(
+                    f"DELETE FROM {table} WHERE root = ? "
+                    f"AND ({column} = ? OR substr({column}, 1, ?) = ?)",
+                    (root, path, len(prefix), prefix),
+                )
@@ -0,0 +1,451 @@
+"""
+Listing of directories in a single :func:`os.scandir` pass.
+
+:class:`ScandirFileSystem` is a file system for the Kivy file choosers that
+reads a directory once and keeps the metadata of its entries in compact
+records. The checks that the file choosers make for every entry
+(`is_dir`, `getsize`, `is_hidden`) are answered from the records instead of
+calling :func:`os.stat` again. The listings of recently visited directories
+are cached, a directory is read again only when its modification or status
+change time differs from the cached one:
+
+.. code-block:: python
+
+    file_system = ScandirFileSystem()
+    names = file_system.listdir("/home/user")
+    record = file_system.get_record("/home/user/report.txt")
+    record.size, record.mtime, record.mode
+    file_system.cache_info()  # CacheInfo(hits=0, misses=1, ...)
+"""
+
+import collections
+import os
+import stat
+import threading
+import time
+
+from kivy.clock import Clock
+from kivy.event import EventDispatcher
+from kivy.uix.filechooser import FileSystemLocal
+from kivy.utils import platform
+
+from kivymd_extensions.filemanager.libs.tasks import BackgroundExecutor
+
+# Attribute of hidden files on Windows.
+FILE_ATTRIBUTE_HIDDEN = 0x2
+# Number of entries read between two calls of the progress callback of
+# :meth:`ScandirFileSystem.scan`.
+SCAN_PROGRESS_STEP = 500
+# Listings of directories modified less than this number of nanoseconds
+# before they were read are not reused, a change made in the same tick of
+# the file system clock would not change the modification time.
+RACY_INTERVAL = 2 * 10**9
+# Maximum number of remembered counts of entries and names of subdirectories
+# of directories that are not listed.
+MAX_COUNTS = 4096
+
+EntryRecord = collections.namedtuple(
+    "EntryRecord",
+    "name is_dir is_link size mtime mode uid gid hidden",
+)
+EntryRecord.__doc__ = """
+Metadata of a directory entry. `size`, `mtime` and `mode` are those of the
+target of a symbolic link, unless the link is broken.
+"""
+
+CacheInfo = collections.namedtuple(
+    "CacheInfo", "hits misses directories entries"
+)
+CacheInfo.__doc__ = """
+Statistics of the cache of listings, see :meth:`ScandirFileSystem.cache_info`.
+"""
+
+
+def get_entry_record(entry):
+    """Returns an :class:`EntryRecord` for the `entry` DirEntry object."""
+
+    try:
+        st = entry.stat()
+    except OSError:
+        # A broken symbolic link.
+        st = entry.stat(follow_symlinks=False)
+    return _create_record(entry.name, st, entry.is_symlink())
+
+
+def get_path_record(path):
+    """Returns an :class:`EntryRecord` for `path` or None."""
+
+    try:
+        st = os.stat(path)
+        is_link = os.path.islink(path)
+    except OSError:
+        return None
+    return _create_record(os.path.basename(path), st, is_link)
+
+
+def _create_record(name, st, is_link):
+    if platform == "win":
+        hidden = bool(st.st_file_attributes & FILE_ATTRIBUTE_HIDDEN)
+    else:
+        hidden = name.startswith(".")
+    return EntryRecord(
+        name,
+        stat.S_ISDIR(st.st_mode),
+        is_link,
+        st.st_size,
+        st.st_mtime,
+        st.st_mode,
+        st.st_uid,
+        st.st_gid,
+        hidden,
+    )
+
+
+class ScandirFileSystem(FileSystemLocal):
+    """
+    File system that lists directories with :func:`os.scandir` and answers
+    questions about their entries from the listing.
+
+    :param max_directories: the maximum number of cached listings.
+    :param max_entries: the maximum number of entries in all cached
+                        listings, the listing of the last read directory is
+                        kept even if it is larger.
+    """
+
+    def __init__(self, max_directories=64, max_entries=200000):
+        self.max_directories = max_directories
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        # `(times, records)` tuples by the paths to the listed directories,
+        # where `times` are the modification and status change times of the
+        # directory and `records` are the records by name.
+        self._listings = collections.OrderedDict()
+        self._entries = 0
+        # `(times, count)` tuples by the paths to counted directories.
+        self._counts = collections.OrderedDict()
+        # `(times, directories)` tuples by the paths to directories whose
+        # subdirectories are listed, see :meth:`list_directories`.
+        self._directories = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def scan(self, path, canceled=None, on_progress=None):
+        """
+        Lists the `path` directory. Returns a dictionary of
+        :class:`EntryRecord` objects by name, which must not be modified,
+        or None if it was canceled.
+
+        :param canceled: a callable, when it returns True the listing is
+                         stopped.
+        :param on_progress: a callable that is called with the number of
+                            entries read so far.
+        :raises OSError: if the directory cannot be read.
+        """
+
+        directory = self._normalize(path)
+        st = os.stat(directory)
+        times = (st.st_mtime_ns, st.st_ctime_ns)
+        with self._lock:
+            listing = self._listings.get(directory)
+            if listing is not None and listing[0] == times:
+                self.hits += 1
+                self._listings.move_to_end(directory)
+                return listing[1]
+            self.misses += 1
+        if time.time() * 10**9 - max(times) < RACY_INTERVAL:
+            times = None
+        records = {}
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                try:
+                    records[entry.name] = get_entry_record(entry)
+                except OSError:
+                    continue
+                if len(records) % SCAN_PROGRESS_STEP == 0:
+                    if canceled and canceled():
+                        return None
+                    if on_progress:
+                        on_progress(len(records))
+        with self._lock:
+            self._remove(directory)
+            self._listings[directory] = (times, records)
+            self._entries += len(records)
+            while len(self._listings) > 1 and (
+                len(self._listings) > self.max_directories
+                or self._entries > self.max_entries
+            ):
+                self._remove(next(iter(self._listings)))
+        return records
+
+    def count_entries(self, path):
+        """
+        Returns the number of entries in the `path` directory. The entries
+        are counted from the cached listing of the directory if it is up to
+        date, otherwise they are counted without reading their metadata.
+
+        :raises OSError: if the directory cannot be read.
+        """
+
+        directory = self._normalize(path)
+        st = os.stat(directory)
+        times = (st.st_mtime_ns, st.st_ctime_ns)
+        with self._lock:
+            listing = self._listings.get(directory)
+            if listing is not None and listing[0] == times:
+                return len(listing[1])
+            counted = self._counts.get(directory)
+            if counted is not None and counted[0] == times:
+                return counted[1]
+        with os.scandir(directory) as entries:
+            count = sum(1 for entry in entries)
+        if time.time() * 10**9 - max(times) >= RACY_INTERVAL:
+            with self._lock:
+                self._counts[directory] = (times, count)
+                self._counts.move_to_end(directory)
+                while len(self._counts) > MAX_COUNTS:
+                    self._counts.popitem(last=False)
+        return count
+
+    def list_directories(self, path):
+        """
+        Returns a dictionary of whether the subdirectories of `path` are
+        hidden by their names. The subdirectories are taken from the cached
+        listing of the directory if it is up to date, otherwise only the
+        types of the entries are read, which does not need :func:`os.stat`
+        on most file systems.
+
+        :raises OSError: if the directory cannot be read.
+        """
+
+        directory = self._normalize(path)
+        st = os.stat(directory)
+        times = (st.st_mtime_ns, st.st_ctime_ns)
+        with self._lock:
+            listing = self._listings.get(directory)
+            if listing is not None and listing[0] == times:
+                return {
+                    name: record.hidden
+                    for name, record in listing[1].items()
+                    if record.is_dir
+                }
+            listed = self._directories.get(directory)
+            if listed is not None and listed[0] == times:
+                return listed[1]
+        directories = {}
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                try:
+                    if not entry.is_dir():
+                        continue
+                    if platform == "win":
+                        # The attributes are read by the listing on Windows.
+                        hidden = bool(
+                            entry.stat().st_file_attributes
+                            & FILE_ATTRIBUTE_HIDDEN
+                        )
+                    else:
+                        hidden = entry.name.startswith(".")
+                except OSError:
+                    continue
+                directories[entry.name] = hidden
+        if time.time() * 10**9 - max(times) >= RACY_INTERVAL:
+            with self._lock:
+                self._directories[directory] = (times, directories)
+                self._directories.move_to_end(directory)
+                while len(self._directories) > MAX_COUNTS:
+                    self._directories.popitem(last=False)
+        return directories
+
+    def invalidate(self, path):
+        """
+        Forgets the listing of the `path` directory, for example when a file
+        in it is modified without changing the directory.
+        """
+
+        with self._lock:
+            directory = self._normalize(path)
+            self._remove(directory)
+            self._counts.pop(directory, None)
+            self._directories.pop(directory, None)
+
+    def update_records(self, paths):
+        """
+        Reads the `paths` files again and updates their records in the
+        cached listings, for example after the files are created, renamed or
+        removed by the application. The times of the directories are kept,
+        so the next :meth:`scan` still reads them again.
+        """
+
+        for path in paths:
+            directory, name = os.path.split(self._normalize(path))
+            record = get_path_record(os.path.join(directory, name))
+            with self._lock:
+                listing = self._listings.get(directory)
+                if listing is None:
+                    continue
+                # The returned dictionaries of records are never modified.
+                records = dict(listing[1])
+                if record is None:
+                    records.pop(name, None)
+                else:
+                    records[name] = record
+                self._entries += len(records) - len(listing[1])
+                self._listings[directory] = (listing[0], records)
+
+    def cache_info(self):
+        """Returns a :class:`CacheInfo` object."""
+
+        with self._lock:
+            return CacheInfo(
+                self.hits, self.misses, len(self._listings), self._entries
+            )
+
+    def get_record(self, path):
+        """
+        Returns the :class:`EntryRecord` of `path` from the listing of its
+        directory, the file is read if the directory is not listed.
+        Returns None if the file does not exist.
+        """
+
+        # The paths given by the file choosers are already normalized.
+        directory, name = os.path.split(path)
+        listing = self._listings.get(directory)
+        if listing is None:
+            directory, name = os.path.split(self._normalize(path))
+            with self._lock:
+                listing = self._listings.get(directory)
+        record = listing[1].get(name) if listing is not None else None
+        if record is None:
+            record = get_path_record(path)
+        return record
+
+    def listdir(self, fn):
+        return list(self.scan(fn))
+
+    def getsize(self, fn):
+        record = self.get_record(fn)
+        if record is None:
+            raise FileNotFoundError(fn)
+        return record.size
+
+    def is_hidden(self, fn):
+        record = self.get_record(fn)
+        if record is None:
+            return super().is_hidden(fn)
+        return record.hidden
+
+    def is_dir(self, fn):
+        record = self.get_record(fn)
+        return record is not None and record.is_dir
+
+    def _remove(self, directory):
+        listing = self._listings.pop(directory, None)
+        if listing is not None:
+            self._entries -= len(listing[1])
+
+    def _normalize(self, path):
+        return os.path.normpath(os.path.abspath(os.path.expanduser(path)))
+
+
+class DirectoryCounter:
+    """
+    Counts the entries of directories on a background thread, see
+    :meth:`ScandirFileSystem.count_entries`.
+
+    :param file_system: a :class:`ScandirFileSystem` object.
+    """
+
+    def __init__(self, file_system):
+        self.file_system = file_system
+        # <kivymd_extensions.filemanager.libs.tasks.BackgroundExecutor object>
+        self._executor = BackgroundExecutor()
+
+    def get_count(self, path):
+        """Returns the number of entries or None if it cannot be read."""
+
+        try:
+            return self.file_system.count_entries(path)
+        except OSError:
+            return None
+
+    def request(self, path, callback):
+        """
+        Calls `callback(count)` on the main thread with the number of
+        entries in the `path` directory. Returns a
+        :class:`concurrent.futures.Future` object, the callback is not
+        called if it is canceled.
+        """
+
+        return self._executor.submit(
+            lambda future: callback(future.result()), self.get_count, path
+        )
+
+    def stop(self):
+        """Cancels the requests that are not started yet."""
+
+        self._executor.stop()
+
+
+class DirectoryModel(EventDispatcher):
+    """
+    Listings of the directories of a tab, shared by its views. The list of
+    files takes the records of a directory with :meth:`scan` and the
+    directory tree takes only the subdirectories with
+    :meth:`list_directories`. The subdirectories of every listing are
+    dispatched with the `on_directories` event, so a directory listed by one
+    view is not listed again by the other one:
+
+    .. code-block:: python
+
+        model = DirectoryModel(file_system)
+        model.bind(on_directories=lambda model, path, directories: ...)
+        model.scan("/home/user")  # {"Documents": EntryRecord(...), ...}
+
+    :param file_system: a :class:`ScandirFileSystem` object.
+
+    :Events:
+        `on_directories`
+            Called on the main thread with the path to a listed directory
+            and a dictionary of whether its subdirectories are hidden by
+            their names.
+    """
+
+    __events__ = ("on_directories",)
+
+    def __init__(self, file_system, **kwargs):
+        self.file_system = file_system
+        super().__init__(**kwargs)
+
+    def scan(self, path, canceled=None, on_progress=None):
+        """See :meth:`ScandirFileSystem.scan`."""
+
+        records = self.file_system.scan(
+            path, canceled=canceled, on_progress=on_progress
+        )
+        if records is not None:
+            self._post_directories(
+                path,
+                {
+                    name: record.hidden
+                    for name, record in records.items()
+                    if record.is_dir
+                },
+            )
+        return records
+
+    def list_directories(self, path):
+        """See :meth:`ScandirFileSystem.list_directories`."""
+
+        directories = self.file_system.list_directories(path)
+        self._post_directories(path, directories)
+        return directories
+
+    def on_directories(self, path, directories):
+        pass
+
+    def _post_directories(self, path, directories):
+        # May be called on any thread.
+        path = os.path.normpath(os.path.abspath(path))
+        Clock.schedule_once(
+            lambda dt: self.dispatch("on_directories", path, directories)
+        )
@@ -36,3 +36,5 @@ class PluginBaseDialog(ThemableBehavior, ModalView):
     instance_context_menu = ObjectProperty()
     # <filemanager.filemanager.FileManager object at 0x115f12cd0>
     instance_manager = ObjectProperty()
+    # Paths to the files created, renamed or removed in the dialog.
+    changed_paths = ListProperty()
@@ -4,11 +4,25 @@ from .rename import DialogRename
 from .ziparchive import DialogZipArchive
 
 
+class ContextMenuEntry:
+    """
+    Entry on which the context menu was opened. The views of the entries
+    are reused for other files when the listing changes, so the menu and
+    its dialogs keep the path of the clicked entry instead of its view.
+    """
+
+    def __init__(self, path, view=None):
+        self.path = path
+        # The clicked widget, the context menu is opened next to it. It is
+        # not kept by the items of the menu.
+        self.view = view
+
+
 class ContextMenuPlugin:
     def __init__(self, instance_manager=None, entry_object=None):
         # <__main__.FileManager object>
         self.instance_manager = instance_manager
-        # <kivy.lang.builder.FileThumbEntry object>
+        # <kivymd_extensions.filemanager.libs.plugins.contextmenu.ContextMenuEntry object>
         self.entry_object = entry_object
 
         self.plugin_dialogs = {
@@ -23,8 +37,8 @@ class ContextMenuPlugin:
             name_plugin in self.plugin_dialogs.keys()
             and name_plugin != "show_properties"
         ):
-            self.instance_manager.update_files(
-                instance_plugin_dialog, self.entry_object.path
+            self.instance_manager.refresh_paths(
+                instance_plugin_dialog.changed_paths
             )
             self.instance_manager.dispatch("on_context_menu", name_plugin)
         self.instance_manager.dispatch(
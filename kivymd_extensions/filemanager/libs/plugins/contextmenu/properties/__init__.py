@@ -44,7 +44,11 @@ class DialogProperties(PluginBaseDialog):
             return f"Count files {count}"
 
     def get_access_string(self):
-        return get_access_string(self.instance_context_menu.entry_object.path)
+        path = self.instance_context_menu.entry_object.path
+        file_system = getattr(self.instance_manager, "file_system", None)
+        # The mode of the file is taken from the listing of its directory.
+        record = file_system.get_record(path) if file_system else None
+        return get_access_string(path, record)
 
     def set_access(self, interval):
         access_list = list(self.get_access_string())
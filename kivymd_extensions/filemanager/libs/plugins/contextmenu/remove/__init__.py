@@ -11,4 +11,8 @@ with open(
 
 
 class DialogMoveToTrash(PluginBaseDialog):
-    pass
+    def remove_file(self):
+        path = self.instance_context_menu.entry_object.path
+        os.remove(path)
+        self.changed_paths = [path]
+        self.dismiss()
@@ -16,13 +16,10 @@ class DialogRename(PluginBaseDialog):
         self.ids.field.focus = True
 
     def rename_file(self, new_file_name):
-        os.rename(
-            self.instance_context_menu.entry_object.path,
-            os.path.join(
-                os.path.dirname(self.instance_context_menu.entry_object.path),
-                new_file_name,
-            ),
-        )
+        path = self.instance_context_menu.entry_object.path
+        new_path = os.path.join(os.path.dirname(path), new_file_name)
+        os.rename(path, new_path)
+        self.changed_paths = [path, new_path]
         self.dismiss()
 
     def on_open(self):
@@ -38,6 +38,7 @@ class DialogZipArchive(PluginBaseDialog):
                 zip_file.write(path, os.path.split(path)[1])
 
             zip_file.close()
+            self.changed_paths = [f"{path}.zip"]
             self.dismiss()
 
         path = self.instance_context_menu.entry_object.path
@@ -0,0 +1,158 @@
+"""
+Query engine for the search field of the file manager.
+
+A query is compiled once into a predicate on file names, so the cost of
+matching a file does not depend on the type of the search:
+
+.. code-block:: python
+
+    query = Query("rep", "fuzzy")
+    query.match("report.txt")  # True
+    query.score("report.txt")
+
+Available types of queries:
+
+    `name`
+        Case-insensitive substring of the name.
+    `ext`
+        Case-insensitive extension, with or without the leading dot.
+    `glob`
+        Case-insensitive shell pattern, for example ``*.tar.*``.
+    `regex`
+        Case-insensitive regular expression searched in the name.
+    `fuzzy`
+        The characters of the query appear in the name in the same order.
+"""
+
+import fnmatch
+import re
+
+QUERY_TYPES = ("name", "ext", "glob", "regex", "fuzzy")
+
+
+class Query:
+    """
+    Compiled search query.
+
+    :raises ValueError: if `type` is unknown or `text` is not a valid regular
+                        expression.
+    """
+
+    def __init__(self, text, type="name"):
+        if type not in QUERY_TYPES:
+            raise ValueError(f"Unknown type of query: {type}")
+        self.text = text
+        self.type = type
+        # Lower case extension without the dot for searching by extension.
+        self.extension = None
+        # The case is ignored with `lower`, not with `casefold`, which would
+        # also change the letters, like "ß" to "ss", and then the names that
+        # match could not be found with :meth:`like_pattern`.
+        folded_text = text.lower()
+
+        if type == "name":
+            self.match = lambda name: folded_text in name.lower()
+        elif type == "ext":
+            suffix = "." + folded_text.lstrip(".")
+            self.extension = suffix[1:]
+            self.match = lambda name: name.lower().endswith(suffix)
+        else:
+            if type == "glob":
+                pattern = fnmatch.translate(text)
+            elif type == "regex":
+                pattern = text
+            else:
+                pattern = ".*?".join(re.escape(char) for char in text)
+            try:
+                regex = re.compile(pattern, re.IGNORECASE)
+            except re.error as error:
+                raise ValueError(f"Invalid regular expression: {error}")
+            self._regex = regex
+            if type == "glob":
+                self.match = lambda name: regex.match(name) is not None
+            else:
+                self.match = lambda name: regex.search(name) is not None
+
+    def score(self, name):
+        """
+        Returns the relevance of a matching `name`, higher is better.
+        Exact matches, matches at the start of the name or of a word and
+        short names are ranked first.
+        """
+
+        folded_name = name.lower()
+        folded_text = self.text.lower()
+        stem = folded_name.rsplit(".", 1)[0]
+        score = 1.0 / (1 + len(name))
+        if folded_name == folded_text or stem == folded_text:
+            return 3.0 + score
+        if self.type == "fuzzy":
+            match = self._regex.search(name)
+            if not match:
+                return 0.0
+            start = match.start()
+            span = match.end() - start
+            # Characters that follow each other are better than scattered.
+            score += len(self.text) / max(span, 1)
+            if start == 0 or not folded_name[start - 1].isalnum():
+                score += 0.5
+            return score
+        if self.type == "name":
+            position = folded_name.find(folded_text)
+            if position == 0:
+                score += 2.0
+            elif position > 0 and not folded_name[position - 1].isalnum():
+                score += 1.0
+            return score + 0.5
+        return score + 1.0
+
+    def refines(self, query):
+        """
+        Returns True if every name that matches this query also matches the
+        `query` query, so the results of `query` can be filtered instead of
+        searching again.
+        """
+
+        if self.type != query.type:
+            return False
+        if self.text == query.text:
+            return True
+        text = self.text.lower()
+        if self.type == "name":
+            return query.text.lower() in text
+        if self.type == "fuzzy":
+            # The characters of `query` are a subsequence of this query.
+            characters = iter(text)
+            return all(char in characters for char in query.text.lower())
+        return False
+
+    def like_pattern(self):
+        """
+        Returns an SQL `LIKE` pattern that every matching name satisfies or
+        None. The pattern may also match other names, so the results have to
+        be checked with :meth:`match`.
+        """
+
+        if self.type == "name":
+            pattern = f"%{self.text}%"
+        elif self.type == "ext":
+            pattern = f"%.{self.extension}"
+        elif self.type == "fuzzy":
+            pattern = "%" + "%".join(self.text) + "%"
+        elif self.type == "glob":
+            pattern = self.text
+            start = pattern.find("[")
+            end = pattern.rfind("]")
+            if -1 < start < end:
+                # Character sets are replaced as a whole.
+                pattern = f"{pattern[:start]}%{pattern[end + 1:]}"
+            pattern = pattern.replace("*", "%").replace("?", "_")
+        else:
+            return None
+        # SQLite ignores the case of ASCII letters only. Other characters
+        # and the ASCII letters that match other characters when the case is
+        # ignored, like "k" and the Kelvin sign, match any characters.
+        return "".join(
+            "%" if ord(char) >= 128 else "_" if char in "IiKkSs" else char
+            for char in pattern
+        )
@@ -0,0 +1,112 @@
+"""
+Bounded store for the results of a file search.
+
+The store keeps only the best `limit` results in a heap, so a broad search
+over millions of files uses a fixed amount of memory. Every path is kept,
+including files with the same name in different directories:
+
+.. code-block:: python
+
+    results = ResultStore(limit=1000, key=lambda path: len(path))
+    results.add(["/a/report.txt", "/b/report.txt"])
+    results.total  # 2
+    results.get_page(0, 100)  # [(path, detail), ...], best results first
+"""
+
+import heapq
+import os
+import sys
+import threading
+
+
+def get_mtime(path):
+    """Sorting key by modification time of the file, newest first."""
+
+    try:
+        return os.stat(path).st_mtime
+    except OSError:
+        return 0
+
+
+class ResultStore:
+    """
+    Thread-safe store of the best results of a search.
+
+    :param limit: the maximum number of kept results. With 0 the results
+                  are only counted.
+    :param key: a callable that takes a path and returns its rank,
+                higher is better. Results are kept in the order in which
+                they are found by default.
+    """
+
+    def __init__(self, limit=10000, key=None):
+        self.limit = max(0, limit)
+        self.key = key
+        # Number of added results, including those that were dropped.
+        self.total = 0
+        # Min-heap of `(rank, -number, directory, name, detail)` tuples,
+        # the worst result is on top. Of two equal ranks the earlier result
+        # is better.
+        self._heap = []
+        self._sorted = None
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._heap)
+
+    def add(self, paths, details=None):
+        """
+        Adds the paths to found files. Can be called from any thread.
+
+        :param details: a list of strings displayed with the paths,
+                        for example the matching lines of the files.
+        """
+
+        key = self.key
+        items = []
+        for i, path in enumerate(paths):
+            directory, name = os.path.split(path)
+            items.append(
+                # Directories are shared by all files found in them.
+                (
+                    key(path) if key else 0,
+                    sys.intern(directory),
+                    name,
+                    details[i] if details else "",
+                )
+            )
+        with self._lock:
+            heap = self._heap
+            for rank, directory, name, detail in items:
+                self.total += 1
+                item = (rank, -self.total, directory, name, detail)
+                if len(heap) < self.limit:
+                    heapq.heappush(heap, item)
+                elif heap and item > heap[0]:
+                    heapq.heapreplace(heap, item)
+            self._sorted = None
+
+    def get_results(self):
+        """
+        Returns a list of `(path, detail)` tuples of the kept results,
+        the best results first.
+        """
+
+        with self._lock:
+            if self._sorted is None:
+                self._sorted = [
+                    (os.path.join(directory, name), detail)
+                    for rank, number, directory, name, detail in sorted(
+                        self._heap, reverse=True
+                    )
+                ]
+            return self._sorted
+
+    def get_page(self, page, page_size):
+        """Returns the results on the page with the `page` index."""
+
+        start = page * page_size
+        return self.get_results()[start : start + page_size]
+
+    def get_page_count(self, page_size):
+        return max(1, -(-len(self._heap) // page_size))
@@ -0,0 +1,347 @@
+"""
+Cache of the results of file searches.
+
+For every search the cache remembers the matching files and the modification
+times of the directories that were read. When the search is repeated, only
+the directories that have changed since are read again. A search that
+refines a cached one, for example `report` after `rep`, filters the cached
+files instead of walking the tree. The memory of the cache is limited by the
+number of the remembered directories and files, searches that find more are
+not cached:
+
+.. code-block:: python
+
+    cache = SearchCache()
+    cache.search("/home/user", Query("rep"), walk, on_results=print)
+    cache.search("/home/user", Query("report"), walk, on_results=print)
+"""
+
+import collections
+import os
+import threading
+
+
+class SearchCacheEntry:
+    """
+    Files matching `query` in the `root` directory.
+
+    :param max_items: the maximum number of remembered directories and
+                      files, or None. When a scan reads more, the entry
+                      forgets them and cannot be cached.
+    """
+
+    def __init__(self, root, query, max_items=None):
+        self.root = root
+        self.query = query
+        self.max_items = max_items
+        # Modification times of the read directories.
+        self.dirs = {}
+        # Names of the matching files by directory.
+        self.files = {}
+        # Number of the items added by the scans.
+        self._added = 0
+        # Whether the scans read more than `max_items` items.
+        self.too_large = False
+        # Ignore rules of the directories read again by `update`, by path.
+        self._ignore_rules = {}
+        self.lock = threading.Lock()
+        # Guards `dirs`, `files` and `_added`, the walker threads record the
+        # directories while they are read.
+        self._items_lock = threading.Lock()
+
+    def get_size(self):
+        """Returns the number of remembered directories and files."""
+
+        with self._items_lock:
+            return len(self.dirs) + sum(
+                len(names) for names in self.files.values()
+            )
+
+    def get_paths(self):
+        return [
+            os.path.join(directory, name)
+            for directory, names in self.files.items()
+            for name in names
+        ]
+
+    def record_directory(self, directory):
+        # The time is taken before the directory is read, so changes made
+        # while it is read are picked up by the next search.
+        try:
+            mtime = os.stat(directory).st_mtime_ns
+        except OSError:
+            return
+        with self._items_lock:
+            if not self.too_large:
+                self.dirs[directory] = mtime
+                self._count(1)
+
+    def scan(
+        self,
+        path,
+        walk,
+        depth=0,
+        on_results=None,
+        canceled=None,
+        ignore_rules=(),
+    ):
+        """
+        Walks the `path` directory. Returns False if it was canceled.
+
+        :param ignore_rules: the ignore rules of the parents of `path`.
+        """
+
+        for directory, names in walk(
+            path, self.query.match, self.record_directory, depth, ignore_rules
+        ):
+            if canceled and canceled():
+                return False
+            with self._items_lock:
+                if not self.too_large:
+                    self.files[directory] = names
+                    self._count(len(names))
+            if on_results:
+                on_results([os.path.join(directory, name) for name in names])
+        return not (canceled and canceled())
+
+    def update(self, walk, rules=None, canceled=None):
+        """
+        Reads again the directories that have changed since the last search.
+        Returns False if it was canceled.
+        """
+
+        self._added = self.get_size()
+        self._ignore_rules = {}
+        with self._items_lock:
+            dirs = list(self.dirs.items())
+        for directory, mtime in dirs:
+            if canceled and canceled():
+                return False
+            if self.too_large:
+                break
+            if directory not in self.dirs:
+                # Removed with a parent directory.
+                continue
+            try:
+                current_mtime = os.stat(directory).st_mtime_ns
+            except OSError:
+                self._remove_tree(directory)
+                continue
+            if current_mtime != mtime and not self._rescan(
+                directory, walk, rules, canceled
+            ):
+                return False
+        return True
+
+    def refine(self, query):
+        """Returns a new entry for `query` that refines the entry query."""
+
+        entry = SearchCacheEntry(self.root, query, self.max_items)
+        match = query.match
+        with self._items_lock:
+            entry.dirs = dict(self.dirs)
+            for directory, names in self.files.items():
+                names = [name for name in names if match(name)]
+                if names:
+                    entry.files[directory] = names
+        return entry
+
+    def _count(self, items):
+        # Called with `_items_lock` held.
+        self._added += items
+        if self.max_items is not None and self._added > self.max_items:
+            # The items are not kept until the scan is complete.
+            self.too_large = True
+            self.dirs.clear()
+            self.files.clear()
+
+    def _rescan(self, directory, walk, rules, canceled):
+        self.record_directory(directory)
+        relative_path = os.path.relpath(directory, self.root)
+        depth = 0 if relative_path == "." else relative_path.count(os.sep) + 1
+        ignore_rules = self._get_ignore_rules(directory, rules)
+        match = self.query.match
+        names = []
+        new_dirs = []
+        try:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    try:
+                        if entry.is_dir():
+                            if not (
+                                entry.is_symlink()
+                                or entry.path in self.dirs
+                                or (
+                                    rules
+                                    and rules.skip_directory(
+                                        entry, depth + 1, ignore_rules
+                                    )
+                                )
+                            ):
+                                new_dirs.append(entry.path)
+                        elif rules and rules.skip_file(entry, ignore_rules):
+                            continue
+                        elif match(entry.name):
+                            names.append(entry.name)
+                    except OSError:
+                        continue
+        except OSError:
+            self._remove_tree(directory)
+            return True
+        with self._items_lock:
+            if self.too_large:
+                return True
+            if names:
+                self.files[directory] = names
+                self._count(len(names))
+            else:
+                self.files.pop(directory, None)
+        for path in new_dirs:
+            if not self.scan(
+                path,
+                walk,
+                depth + 1,
+                canceled=canceled,
+                ignore_rules=ignore_rules,
+            ):
+                return False
+        return True
+
+    def _get_ignore_rules(self, directory, rules):
+        # The rules of the ignore files from the root down to `directory`,
+        # as the walk collects them.
+        if not rules:
+            return ()
+        ignore_rules = self._ignore_rules.get(directory)
+        if ignore_rules is None:
+            parent = os.path.dirname(directory)
+            if directory == self.root or parent == directory:
+                inherited_rules = ()
+            else:
+                inherited_rules = self._get_ignore_rules(parent, rules)
+            ignore_rules = self._ignore_rules[
+                directory
+            ] = rules.get_ignore_rules(directory, inherited_rules)
+        return ignore_rules
+
+    def _remove_tree(self, path):
+        prefix = path.rstrip(os.sep) + os.sep
+        with self._items_lock:
+            for data in (self.dirs, self.files):
+                for directory in [
+                    d for d in data if d == path or d.startswith(prefix)
+                ]:
+                    del data[directory]
+
+
+class SearchCache:
+    """
+    Least recently used cache of the results of searches by
+    `(root, type of query, text of query)`.
+
+    :param max_entries: the maximum number of cached searches.
+    :param max_items: the maximum number of directories and files remembered
+                      by all cached searches. A search that remembers more
+                      is not cached.
+    """
+
+    def __init__(self, max_entries=16, max_items=200000):
+        self.max_entries = max_entries
+        self.max_items = max_items
+        self._entries = collections.OrderedDict()
+        # Sizes of the cached searches by key.
+        self._sizes = {}
+        self._lock = threading.Lock()
+
+    def search(
+        self, root, query, walk, rules=None, on_results=None, canceled=None
+    ):
+        """
+        Searches for files matching `query` in the `root` directory.
+
+        :param walk: a callable
+                     `walk(path, match, on_directory, depth, ignore_rules)`
+                     that returns an iterable of `(directory, names)` tuples,
+                     see
+                     :class:`~kivymd_extensions.filemanager.libs.walker.TreeWalker`.
+        :param rules: a
+                      :class:`~kivymd_extensions.filemanager.libs.walker.PruneRules`
+                      object used by `walk`.
+        :param on_results: a callable that is called with lists of paths to
+                           the found files.
+        :param canceled: a callable, when it returns True the search is
+                         stopped.
+        """
+
+        root = os.path.abspath(root)
+        entry = self._find(root, query)
+        if entry is not None:
+            with entry.lock:
+                if not entry.update(walk, rules, canceled):
+                    # The tree is only partly read again.
+                    self.discard(entry)
+                    return
+                if not entry.too_large:
+                    if entry.query.text != query.text:
+                        entry = entry.refine(query)
+                    self._store(entry)
+                    if on_results:
+                        on_results(entry.get_paths())
+                    return
+            # The tree has grown too large to be cached.
+            self.discard(entry)
+        entry = SearchCacheEntry(root, query, self.max_items)
+        with entry.lock:
+            if entry.scan(root, walk, 0, on_results, canceled):
+                self._store(entry)
+
+    def discard(self, entry):
+        with self._lock:
+            key = (entry.root, entry.query.type, entry.query.text)
+            if self._entries.get(key) is entry:
+                del self._entries[key]
+                del self._sizes[key]
+
+    def clear(self):
+        """Forgets all searches, for example when the search options change."""
+
+        with self._lock:
+            self._entries.clear()
+            self._sizes.clear()
+
+    def _find(self, root, query):
+        # The same search or the longest cached search that it refines.
+        with self._lock:
+            entry = self._entries.get((root, query.type, query.text))
+            if entry is None:
+                candidates = [
+                    cached_entry
+                    for (cached_root, type, text), cached_entry in (
+                        self._entries.items()
+                    )
+                    if cached_root == root and query.refines(cached_entry.query)
+                ]
+                if candidates:
+                    entry = max(
+                        candidates, key=lambda entry: len(entry.query.text)
+                    )
+            if entry is not None:
+                self._entries.move_to_end(
+                    (entry.root, entry.query.type, entry.query.text)
+                )
+            return entry
+
+    def _store(self, entry):
+        key = (entry.root, entry.query.type, entry.query.text)
+        size = None if entry.too_large else entry.get_size()
+        with self._lock:
+            self._entries.pop(key, None)
+            self._sizes.pop(key, None)
+            if size is None or size > self.max_items:
+                return
+            self._entries[key] = entry
+            self._sizes[key] = size
+            while len(self._entries) > self.max_entries or (
+                sum(self._sizes.values()) > self.max_items
+            ):
+                del self._sizes[self._entries.popitem(last=False)[0]]
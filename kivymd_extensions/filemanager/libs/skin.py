@@ -0,0 +1,126 @@
+"""
+Icons of skins packed into texture atlases.
+
+The images of a skin directory are packed into a Kivy atlas the first time
+the directory is used, so all its icons are loaded at once and drawn from
+one texture. The atlas is cached on disk under a hash of the contents of the
+directory and is made again only when an image is added, removed or
+changed:
+
+.. code-block:: python
+
+    icons = get_skin_icons("path/to/skin/files")
+    icons["py"]  # "atlas://.../skins/<hash>/icons/py"
+
+Without Pillow, which is needed to make an atlas, the paths to the images
+are returned instead.
+"""
+
+import hashlib
+import os
+import shutil
+import tempfile
+
+from kivy.atlas import Atlas
+from kivy.logger import Logger
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+from kivymd_extensions.filemanager.libs.thumbnails import is_image
+from kivymd_extensions.filemanager.libs.tools import get_cache_directory
+
+# Maximum width and height of the pages of an atlas, the icons that do not
+# fit into one page are packed into more pages.
+MAX_ATLAS_SIZE = 2048
+# Space in pixels around the icons in an atlas.
+ATLAS_PADDING = 2
+ATLAS_NAME = "icons"
+
+
+def get_skin_hash(paths):
+    """Returns a hash of the names and contents of the `paths` images."""
+
+    digest = hashlib.sha1()
+    for path in sorted(paths):
+        digest.update(os.path.basename(path).encode("utf-8") + b"\0")
+        with open(path, "rb") as image:
+            digest.update(hashlib.sha1(image.read()).digest())
+    return digest.hexdigest()
+
+
+def get_skin_icons(directory, cache_directory=None):
+    """
+    Returns a dictionary of sources of the images in the `directory` by
+    their names without extensions, for example `"py"` for `"py.png"`.
+    The sources are URLs of the images in the atlas of the directory or,
+    if the atlas cannot be made, the paths to the images.
+    """
+
+    paths = {}
+    for name in os.listdir(directory):
+        path = os.path.join(directory, name)
+        if is_image(name) and os.path.isfile(path):
+            paths.setdefault(name.split(".")[0], path)
+    if not paths or Image is None:
+        return paths
+    try:
+        atlas_directory = os.path.join(
+            cache_directory or os.path.join(get_cache_directory(), "skins"),
+            get_skin_hash(paths.values()),
+        )
+        if not os.path.exists(atlas_directory):
+            _create_atlas(atlas_directory, list(paths.values()))
+    except Exception:
+        Logger.exception(f"Skin: cannot pack the icons of <{directory}>")
+        return paths
+    atlas = os.path.join(atlas_directory, ATLAS_NAME)
+    return {
+        name: "atlas://{}/{}".format(
+            atlas, os.path.splitext(os.path.basename(path))[0]
+        )
+        for name, path in paths.items()
+    }
+
+
+def _create_atlas(atlas_directory, paths):
+    # The atlas is made in a temporary directory that is renamed when it is
+    # complete, so a partly written atlas is never used.
+    parent = os.path.dirname(atlas_directory)
+    os.makedirs(parent, exist_ok=True)
+    temporary_directory = tempfile.mkdtemp(dir=parent)
+    try:
+        if not Atlas.create(
+            os.path.join(temporary_directory, ATLAS_NAME),
+            paths,
+            _get_atlas_size(paths),
+            ATLAS_PADDING,
+        ):
+            raise ValueError("an image is larger than the atlas")
+        try:
+            os.rename(temporary_directory, atlas_directory)
+        except OSError:
+            # Made at the same time by another file manager.
+            if not os.path.exists(atlas_directory):
+                raise
+    finally:
+        shutil.rmtree(temporary_directory, ignore_errors=True)
+
+
+def _get_atlas_size(paths):
+    # The smallest power of two that fits the largest icon and, if possible,
+    # all icons together.
+    area = largest = 0
+    for path in paths:
+        with Image.open(path) as image:
+            width, height = image.size
+        width += ATLAS_PADDING
+        height += ATLAS_PADDING
+        area += width * height
+        largest = max(largest, width, height)
+    size = 64
+    while size < largest or (size * size < area * 2 and size < MAX_ATLAS_SIZE):
+        size *= 2
+    return size
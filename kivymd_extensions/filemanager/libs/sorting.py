@@ -0,0 +1,260 @@
+"""
+Sorting of directory listings.
+
+The sort keys are computed from the records of a listing, see
+:class:`~kivymd_extensions.filemanager.libs.listing.EntryRecord`, so the
+files are never read again to sort them. :class:`ListingSorter` computes the
+keys and the order of a listing once, changing the direction or going back
+to a previous order only reuses them:
+
+.. code-block:: python
+
+    sorter = ListingSorter(records)
+    sorter.sort(list(records), "natural")  # ["file2", "file10"]
+    sorter.sort(list(records), "natural", reverse=True)
+"""
+
+import mimetypes
+import re
+
+SORT_ORDERS = ("name", "natural", "ext", "size", "mtime", "type")
+
+_DIGITS = re.compile(r"(\d+)")
+# MIME types by file extension.
+_types = {}
+
+
+def natural_key(name):
+    """Sorting key that orders the numbers in names by value."""
+
+    folded = name.casefold()
+    parts = _DIGITS.split(folded)
+    # Numbers are always at the odd indexes. A number is replaced with its
+    # digits after a null character and a character that grows with the
+    # number of the digits, so the keys are strings, which are compared much
+    # faster than lists, and a number goes before any other character.
+    for index in range(1, len(parts), 2):
+        digits = parts[index]
+        if not digits.isascii():
+            digits = str(int(digits))
+        digits = digits.lstrip("0")
+        parts[index] = "\0" + chr(len(digits) + 1) + digits
+    # Names with the same numbers, like "a01" and "a1", are then ordered as
+    # text.
+    return "".join(parts) + "\0\0" + folded
+
+
+def get_type(extension):
+    """Returns the MIME type of files with the `extension`."""
+
+    mime_type = _types.get(extension)
+    if mime_type is None:
+        mime_type = _types[extension] = (
+            mimetypes.guess_type(f"file{extension}")[0] or ""
+        )
+    return mime_type
+
+
+def _get_extension(name):
+    # The same as `os.path.splitext(name)[1]` for a name, but faster.
+    stem, dot, extension = name.rpartition(".")
+    if not stem.strip("."):
+        return ""
+    return dot + extension
+
+
+def get_primary_key(record, sort_by):
+    """
+    Returns the key of the `record` entry for the `sort_by` order without
+    the name, which orders the entries with the same key.
+    """
+
+    if sort_by == "size":
+        return record.size
+    if sort_by == "mtime":
+        return record.mtime
+    extension = _get_extension(record.name.casefold())
+    if sort_by == "ext":
+        return extension
+    if sort_by == "type":
+        return get_type(extension), extension
+    raise ValueError(f"Unknown sort order: {sort_by}")
+
+
+def get_sort_key(record, sort_by):
+    """
+    Returns the key of the `record` entry for the `sort_by` order, one of
+    :data:`SORT_ORDERS`.
+    """
+
+    if sort_by == "name":
+        return record.name.casefold()
+    if sort_by == "natural":
+        return natural_key(record.name)
+    return get_primary_key(record, sort_by), record.name.casefold()
+
+
+class _NameKeys:
+    # The sort keys of a list of names, for searching the list with
+    # `find_position` without copying it.
+
+    def __init__(self, names, keys):
+        self.names = names
+        self.keys = keys
+
+    def __len__(self):
+        return len(self.names)
+
+    def __getitem__(self, index):
+        return self.keys[self.names[index]]
+
+
+def find_position(keys, key, reverse=False, low=0, high=None):
+    """
+    Returns the index at which `key` is inserted into the `keys` sequence
+    that is sorted in the ascending or, if `reverse` is True, descending
+    order. Only the `keys[low:high]` part is searched.
+    """
+
+    if high is None:
+        high = len(keys)
+    while low < high:
+        middle = (low + high) // 2
+        if (keys[middle] > key) if reverse else (keys[middle] < key):
+            low = middle + 1
+        else:
+            high = middle
+    return low
+
+
+class ListingSorter:
+    """
+    Sorts the names of entries of a listing, directories first.
+
+    :param records: a dictionary of
+                    :class:`~kivymd_extensions.filemanager.libs.listing.EntryRecord`
+                    objects by name.
+    """
+
+    def __init__(self, records):
+        self.records = records
+        # Keys by name by order.
+        self._keys = {}
+        # Sorted names of all entries by order.
+        self._orders = {}
+        # Sorted `(directories, files)` tuples of names by order.
+        self._groups = {}
+
+    def get_keys(self, sort_by):
+        """
+        Returns a dictionary of the keys of all entries by name. The keys of
+        an order are computed when the entries are sorted in it.
+        """
+
+        keys = self._keys.get(sort_by)
+        if keys is None:
+            keys = self._keys[sort_by] = {
+                name: get_sort_key(record, sort_by)
+                for name, record in self.records.items()
+            }
+        return keys
+
+    def sort(self, names, sort_by="name", reverse=False):
+        """
+        Returns a sorted list of the `names` entries, which are all unique
+        names of the listing.
+        """
+
+        groups = self._groups.get(sort_by)
+        if groups is None:
+            records = self.records
+            order = self._get_order(sort_by)
+            groups = self._groups[sort_by] = (
+                [name for name in order if records[name].is_dir],
+                [name for name in order if not records[name].is_dir],
+            )
+        directories, files = groups
+        if len(names) < len(self.records):
+            # Hidden or filtered out entries are not sorted.
+            names = set(names)
+            directories = [name for name in directories if name in names]
+            files = [name for name in files if name in names]
+        else:
+            directories = list(directories)
+            files = list(files)
+        if reverse:
+            directories.reverse()
+            files.reverse()
+        return directories + files
+
+    def _get_order(self, sort_by):
+        order = self._orders.get(sort_by)
+        if order is None:
+            if sort_by in ("name", "natural"):
+                order = sorted(
+                    self.records, key=self.get_keys(sort_by).__getitem__
+                )
+            else:
+                # The sort is stable, so the entries with the same key stay
+                # ordered by name. Comparing only the primary keys is much
+                # faster than comparing tuples.
+                primary_keys = {
+                    name: get_primary_key(record, sort_by)
+                    for name, record in self.records.items()
+                }
+                order = sorted(
+                    self._get_order("name"), key=primary_keys.__getitem__
+                )
+                if sort_by not in self._keys:
+                    name_keys = self._keys["name"]
+                    self._keys[sort_by] = {
+                        name: (key, name_keys[name])
+                        for name, key in primary_keys.items()
+                    }
+            self._orders[sort_by] = order
+        return order
+
+    def update(self, records, names):
+        """
+        Returns a sorter of the `records` listing that differs from the
+        listing of this sorter only in the `names` entries. The computed
+        keys and orders of the other entries are reused, the changed entries
+        are moved to their positions in the orders.
+        """
+
+        names = list(dict.fromkeys(names))
+        sorter = ListingSorter(records)
+        for sort_by, old_keys in self._keys.items():
+            order = self._orders.get(sort_by)
+            if order is not None:
+                order = list(order)
+                # The old entries are taken out first, so the other entries
+                # stay sorted by the old keys while they are searched.
+                for name in names:
+                    if name in old_keys:
+                        del order[self._find_name(order, name, old_keys)]
+            keys = dict(old_keys)
+            for name in names:
+                record = records.get(name)
+                if record is None:
+                    keys.pop(name, None)
+                    continue
+                key = keys[name] = get_sort_key(record, sort_by)
+                if order is not None:
+                    order.insert(
+                        find_position(_NameKeys(order, keys), key), name
+                    )
+            sorter._keys[sort_by] = keys
+            if order is not None:
+                sorter._orders[sort_by] = order
+        return sorter
+
+    def _find_name(self, order, name, keys):
+        # Returns the index of `name` in the `order` list sorted by `keys`.
+        key = keys[name]
+        index = find_position(_NameKeys(order, keys), key)
+        while index < len(order) and keys[order[index]] == key:
+            if order[index] == name:
+                return index
+            index += 1
+        return order.index(name)
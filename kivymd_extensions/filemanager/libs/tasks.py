@@ -0,0 +1,186 @@
+"""
+Bridge between jobs running on background threads and the user interface.
+
+A job posts its progress and results from its own thread. The posts are
+coalesced and delivered on the main thread at most once per
+:attr:`BackgroundTask.interval` seconds, so widgets are never touched from
+the job thread and the UI is not updated for every processed item:
+
+.. code-block:: python
+
+    def count_files(task, path):
+        for directory, dirs, files in os.walk(path):
+            if task.canceled:
+                break
+            task.post_progress(directory=directory)
+            task.post_results(files)
+
+
+    task = BackgroundTask(
+        target=count_files,
+        args=("/",),
+        on_progress=lambda task, progress: print(progress["directory"]),
+        on_results=lambda task, results: print(len(results)),
+        on_complete=lambda task: print("Done"),
+    )
+    task.start()
+
+Short calls, such as reading a single file, are queued to a
+:class:`BackgroundExecutor` instead.
+"""
+
+import concurrent.futures
+import threading
+
+from kivy.clock import Clock
+from kivy.event import EventDispatcher
+from kivy.logger import Logger
+from kivy.properties import NumericProperty
+
+
+class BackgroundTask(EventDispatcher):
+    """
+    Runs `target(task, *args)` on a daemon thread.
+
+    :Events:
+        `on_progress`
+            Called with a dictionary of the latest posted progress values.
+        `on_results`
+            Called with a list of the results posted since the last call.
+        `on_complete`
+            Called once when the job is finished, after the last results.
+    """
+
+    interval = NumericProperty(0.1)
+    """
+    Minimum time in seconds between two deliveries to the main thread.
+
+    :attr:`interval` is an :class:`~kivy.properties.NumericProperty`
+    and defaults to `0.1`.
+    """
+
+    __events__ = ("on_progress", "on_results", "on_complete")
+
+    def __init__(self, target=None, args=(), **kwargs):
+        handlers = {
+            name: kwargs.pop(name) for name in self.__events__ if name in kwargs
+        }
+        super().__init__(**kwargs)
+        self.bind(**handlers)
+        self.target = target
+        self.args = args
+        self.completed = False
+        self._canceled = threading.Event()
+        self._lock = threading.Lock()
+        self._progress = {}
+        self._results = []
+        self._finished = False
+        self._trigger_flush = Clock.create_trigger(self._flush, self.interval)
+
+    @property
+    def canceled(self):
+        """Whether the job was asked to stop."""
+
+        return self._canceled.is_set()
+
+    def start(self):
+        threading.Thread(target=self._run, daemon=True).start()
+        return self
+
+    def cancel(self):
+        """Asks the job to stop. The job has to check :attr:`canceled`."""
+
+        self._canceled.set()
+
+    def post_progress(self, **progress):
+        """Thread-safe. Only the latest value of each key is delivered."""
+
+        with self._lock:
+            self._progress.update(progress)
+        self._trigger_flush()
+
+    def post_results(self, results):
+        """Thread-safe. Results are delivered in batches."""
+
+        with self._lock:
+            self._results.extend(results)
+        self._trigger_flush()
+
+    def on_progress(self, progress):
+        pass
+
+    def on_results(self, results):
+        pass
+
+    def on_complete(self):
+        pass
+
+    def _run(self):
+        try:
+            self.target(self, *self.args)
+        except Exception:
+            Logger.exception(f"BackgroundTask: error in {self.target}")
+        finally:
+            with self._lock:
+                self._finished = True
+            # Delivers the rest without waiting for the interval.
+            Clock.schedule_once(self._flush)
+
+    def _flush(self, *args):
+        with self._lock:
+            progress, self._progress = self._progress, {}
+            results, self._results = self._results, []
+            finished = self._finished
+        if progress:
+            self.dispatch("on_progress", progress)
+        if results:
+            self.dispatch("on_results", results)
+        if finished and not self.completed:
+            self.completed = True
+            self.dispatch("on_complete")
+
+
+class BackgroundExecutor:
+    """
+    Runs calls on a pool of threads that is started with the first call.
+
+    :param workers: the number of threads.
+    """
+
+    def __init__(self, workers=1):
+        self.workers = workers
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def submit(self, callback, function, *args):
+        """
+        Calls `function(*args)` on a thread of the pool and `callback(future)`
+        on the main thread when it is done. Returns a
+        :class:`concurrent.futures.Future` object, the callback is not
+        called if it is canceled.
+        """
+
+        with self._lock:
+            if self._executor is None:
+                self._executor = concurrent.futures.ThreadPoolExecutor(
+                    self.workers
+                )
+            future = self._executor.submit(function, *args)
+        future.add_done_callback(
+            lambda future: Clock.schedule_once(
+                lambda dt: future.cancelled() or callback(future)
+            )
+        )
+        return future
+
+    def stop(self):
+        """Cancels the calls that are not started yet."""
+
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor:
+            try:
+                executor.shutdown(wait=False, cancel_futures=True)
+            except TypeError:
+                # `cancel_futures` needs Python 3.9.
+                executor.shutdown(wait=False)
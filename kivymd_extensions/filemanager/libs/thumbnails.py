@@ -0,0 +1,241 @@
+"""
+Thumbnails of images.
+
+Images are decoded and scaled down on a pool of threads with
+`Pillow <https://python-pillow.org>`_, which releases the GIL while it works.
+The thumbnails are stored in the cache of the
+`freedesktop.org thumbnail specification
+<https://specifications.freedesktop.org/thumbnail-spec/latest/>`_,
+so they are shared with other file managers and made only once for every
+version of a file. The textures of the last shown thumbnails are kept in
+memory:
+
+.. code-block:: python
+
+    loader = ThumbnailLoader()
+    request = loader.request(
+        "/home/user/photo.jpg", mtime, size, lambda texture: print(texture)
+    )
+    ...
+    request.cancel()  # The image is no longer shown.
+
+Without Pillow, :attr:`ThumbnailLoader.available` is False and no
+thumbnails are made.
+"""
+
+import collections
+import hashlib
+import os
+import tempfile
+import urllib.parse
+
+from kivy.graphics.texture import Texture
+from kivy.logger import Logger
+
+from kivymd_extensions.filemanager.libs.tasks import BackgroundExecutor
+
+try:
+    from PIL import Image, PngImagePlugin
+except ImportError:
+    Image = None
+
+IMAGE_EXTENSIONS = {
+    ".bmp",
+    ".gif",
+    ".jpeg",
+    ".jpg",
+    ".png",
+    ".tif",
+    ".tiff",
+    ".webp",
+}
+# Size of the thumbnails in the `normal` directory of the cache.
+THUMBNAIL_SIZE = 128
+
+
+def get_thumbnail_directory():
+    """Returns the path to the directory of normal size thumbnails."""
+
+    cache_home = os.environ.get("XDG_CACHE_HOME") or os.path.join(
+        os.path.expanduser("~"), ".cache"
+    )
+    return os.path.join(cache_home, "thumbnails", "normal")
+
+
+def get_file_uri(path):
+    return "file://" + urllib.parse.quote(os.path.abspath(path))
+
+
+def get_thumbnail_path(path, directory=None):
+    """Returns the path to the cached thumbnail of the `path` file."""
+
+    name = hashlib.md5(get_file_uri(path).encode("utf-8")).hexdigest()
+    return os.path.join(directory or get_thumbnail_directory(), f"{name}.png")
+
+
+def is_image(path):
+    return os.path.splitext(path)[1].lower() in IMAGE_EXTENSIONS
+
+
+def load_thumbnail(path, directory=None, size=THUMBNAIL_SIZE):
+    """
+    Returns a `((width, height), pixels)` tuple with the RGBA pixels of the
+    thumbnail of the `path` image. The thumbnail is read from the cache if
+    it is up to date, otherwise it is made and saved to the cache.
+
+    :raises OSError: if the image cannot be read.
+    """
+
+    directory = directory or get_thumbnail_directory()
+    st = os.stat(path)
+    mtime = str(int(st.st_mtime))
+    file_size = str(st.st_size)
+    thumbnail_path = get_thumbnail_path(path, directory)
+    try:
+        with Image.open(thumbnail_path) as thumbnail:
+            info = thumbnail.info
+            if info.get("Thumb::MTime") == mtime and (
+                info.get("Thumb::Size", file_size) == file_size
+            ):
+                return _get_pixels(thumbnail)
+    except (OSError, ValueError):
+        pass
+    with Image.open(path) as image:
+        # JPEG images are scaled down while they are decoded.
+        image.draft("RGB", (size, size))
+        image.thumbnail((size, size))
+        thumbnail = image.convert("RGBA")
+    # Thumbnails of thumbnails are never saved.
+    if not os.path.abspath(path).startswith(
+        os.path.join(os.path.dirname(os.path.abspath(directory)), "")
+    ):
+        info = PngImagePlugin.PngInfo()
+        info.add_text("Thumb::URI", get_file_uri(path))
+        info.add_text("Thumb::MTime", mtime)
+        info.add_text("Thumb::Size", file_size)
+        info.add_text("Software", "KivyMD file manager")
+        _save_thumbnail(thumbnail, thumbnail_path, info)
+    return _get_pixels(thumbnail)
+
+
+def _get_pixels(image):
+    if image.mode != "RGBA":
+        image = image.convert("RGBA")
+    return image.size, image.tobytes()
+
+
+def _save_thumbnail(thumbnail, thumbnail_path, info):
+    # The thumbnail is written to a temporary file and renamed, so other
+    # programs never read a partly written thumbnail.
+    directory = os.path.dirname(thumbnail_path)
+    try:
+        os.makedirs(directory, mode=0o700, exist_ok=True)
+        descriptor, temporary_path = tempfile.mkstemp(
+            suffix=".png", dir=directory
+        )
+        try:
+            with os.fdopen(descriptor, "wb") as file:
+                thumbnail.save(file, "PNG", pnginfo=info)
+            os.chmod(temporary_path, 0o600)
+            os.replace(temporary_path, thumbnail_path)
+        except BaseException:
+            os.remove(temporary_path)
+            raise
+    except OSError:
+        Logger.warning(f"Thumbnails: cannot save <{thumbnail_path}>")
+
+
+class ThumbnailRequest:
+    """A request of a thumbnail, see :meth:`ThumbnailLoader.request`."""
+
+    def __init__(self, callback):
+        self.callback = callback
+        self.canceled = False
+        self.future = None
+
+    def cancel(self):
+        """The callback will not be called."""
+
+        self.canceled = True
+        if self.future:
+            self.future.cancel()
+
+
+class ThumbnailLoader:
+    """
+    Makes thumbnails on a pool of threads and keeps the textures of the
+    last used thumbnails.
+
+    :param workers: the number of threads.
+    :param max_textures: the number of textures kept in memory.
+    :param directory: the directory of the cached thumbnails, see
+                      :func:`get_thumbnail_directory`.
+    """
+
+    available = Image is not None
+    """Whether thumbnails can be made, which requires Pillow."""
+
+    def __init__(self, workers=2, max_textures=256, directory=None):
+        self.workers = workers
+        self.max_textures = max_textures
+        self.directory = directory or get_thumbnail_directory()
+        # Textures by `(path, mtime, size)`.
+        self._textures = collections.OrderedDict()
+        # Keys of the images that cannot be read.
+        self._failed = set()
+        # <kivymd_extensions.filemanager.libs.tasks.BackgroundExecutor object>
+        self._executor = BackgroundExecutor(workers)
+
+    def request(self, path, mtime, size, callback):
+        """
+        Calls `callback(texture)` on the main thread with the thumbnail of
+        the `path` image. `mtime` and `size` of the image identify its
+        version. Returns a :class:`ThumbnailRequest` object, or None if the
+        callback was already called or there is no thumbnail.
+        """
+
+        key = (path, mtime, size)
+        texture = self._textures.get(key)
+        if texture is not None:
+            self._textures.move_to_end(key)
+            callback(texture)
+            return None
+        if not self.available or key in self._failed:
+            return None
+        request = ThumbnailRequest(callback)
+        request.future = self._executor.submit(
+            lambda future: self._deliver(key, request),
+            load_thumbnail,
+            path,
+            self.directory,
+        )
+        return request
+
+    def clear(self):
+        """Forgets the textures of all thumbnails."""
+
+        self._textures.clear()
+        self._failed.clear()
+
+    def stop(self):
+        """Cancels the requests that are not started yet."""
+
+        self._executor.stop()
+
+    def _deliver(self, key, request):
+        future = request.future
+        texture = self._textures.get(key)
+        if texture is None:
+            try:
+                size, pixels = future.result()
+            except Exception:
+                self._failed.add(key)
+                return
+            texture = Texture.create(size=size, colorfmt="rgba")
+            texture.blit_buffer(pixels, colorfmt="rgba", bufferfmt="ubyte")
+            texture.flip_vertical()
+            self._textures[key] = texture
+            while len(self._textures) > self.max_textures:
+                self._textures.popitem(last=False)
+        if not request.canceled:
+            request.callback(texture)
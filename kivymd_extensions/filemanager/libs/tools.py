@@ -1,5 +1,9 @@
+import collections
 import string
 import os
+import re
+import stat
+import time
 
 from os import walk
 from os.path import expanduser, isdir, dirname, join, sep
@@ -24,21 +28,128 @@ def file_size(file_path):
         return convert_bytes(file_info.st_size)
 
 
-def get_access_string(path):
-    """Return strind `rwx`."""
+# Types of file systems whose access control lists, servers or kernel checks
+# may allow or deny access regardless of the mode bits, :func:`os.access` is
+# asked there.
+ACL_FILESYSTEMS = frozenset(
+    (
+        "nfs",
+        "nfs4",
+        "cifs",
+        "smb3",
+        "smbfs",
+        "9p",
+        "afs",
+        "ceph",
+        "glusterfs",
+        "fuse.sshfs",
+        "fuseblk",
+        "ntfs",
+        "ntfs3",
+        "proc",
+    )
+)
+# Number of seconds for which the mount points are reused by
+# :func:`get_access`.
+MOUNTS_TIMEOUT = 10
 
-    access_string = ""
-    access_data = {"r": os.R_OK, "w": os.W_OK, "x": os.X_OK}
-    for access in access_data.keys():
-        access_string += access if os.access(path, access_data[access]) else "-"
-    return access_string
+Access = collections.namedtuple("Access", "read write execute")
+Access.__doc__ = """Permissions of the current user to a file."""
 
+# `(time, mounts)` tuple of the last read mount points.
+_mounts = (None, {})
+# IDs of the groups of the current user.
+_groups = None
 
-def get_icon_for_treeview(path, ext, isdir):
+
+def get_access(path, record=None):
+    """
+    Returns an :class:`Access` object for `path`. The access is computed from
+    the mode, the owner and the group of the file, which are taken from the
+    `record`
+    :class:`~kivymd_extensions.filemanager.libs.listing.EntryRecord` object
+    if it is given, so the file is not read again. Like :func:`os.access`,
+    the real user and group IDs are checked and files on read-only mounts
+    are not writable.
+
+    :func:`os.access` is called on Windows, on the file systems in
+    :data:`ACL_FILESYSTEMS` and for the permissions that the mode does not
+    grant, which an access control list may grant.
+    """
+
+    global _groups
+
+    filesystem_type, options = _get_mount(path)
+    if platform == "win" or filesystem_type in ACL_FILESYSTEMS:
+        return Access(
+            os.access(path, os.R_OK),
+            os.access(path, os.W_OK),
+            os.access(path, os.X_OK),
+        )
+    try:
+        if record is None:
+            record = os.stat(path)
+            mode, uid, gid = record.st_mode, record.st_uid, record.st_gid
+        else:
+            mode, uid, gid = record.mode, record.uid, record.gid
+    except OSError:
+        return Access(False, False, False)
+    if stat.S_ISLNK(mode):
+        # The records of broken symbolic links have the mode of the link.
+        return Access(False, False, False)
+    read_only = "ro" in options and (stat.S_ISREG(mode) or stat.S_ISDIR(mode))
+    user = os.getuid()
+    if user == 0:
+        # The superuser may execute files with any execute bit.
+        return Access(
+            True,
+            not read_only,
+            stat.S_ISDIR(mode)
+            or bool(mode & (stat.S_IXUSR | stat.S_IXGRP | stat.S_IXOTH)),
+        )
+    if uid == user:
+        bits = (stat.S_IRUSR, stat.S_IWUSR, stat.S_IXUSR)
+    else:
+        if _groups is None:
+            _groups = frozenset(os.getgroups()) | {os.getgid()}
+        if gid in _groups:
+            bits = (stat.S_IRGRP, stat.S_IWGRP, stat.S_IXGRP)
+        else:
+            bits = (stat.S_IROTH, stat.S_IWOTH, stat.S_IXOTH)
+    access = []
+    for bit, flag in zip(bits, (os.R_OK, os.W_OK, os.X_OK)):
+        if flag == os.W_OK and read_only:
+            access.append(False)
+        else:
+            access.append(bool(mode & bit) or os.access(path, flag))
+    return Access(*access)
+
+
+def _get_mount(path):
+    # Returns the `(type, options)` of the file system of `path`.
+    global _mounts
+
+    now = time.monotonic()
+    if _mounts[0] is None or now - _mounts[0] > MOUNTS_TIMEOUT:
+        _mounts = (now, get_mounts(options=True))
+    if not _mounts[1]:
+        return "", frozenset()
+    return _mounts[1].get(get_mount_point(path, _mounts[1]), ("", frozenset()))
+
+
+def get_access_string(path, record=None):
+    """Return strind `rwx`, see :func:`get_access`."""
+
+    return "".join(
+        letter if allowed else "-"
+        for letter, allowed in zip("rwx", get_access(path, record))
+    )
+
+
+def get_icon_for_treeview(path, ext, isdir, record=None):
     icon_image = "file"
     if isdir:
-        access_string = get_access_string(path)
-        if "r" not in access_string:
+        if not get_access(path, record).read:
             icon_image = "folder-lock"
         else:
             icon_image = "folder"
@@ -59,6 +170,85 @@ def get_home_directory():
     return user_path
 
 
+def get_cache_directory():
+    """Return the directory in which the file manager keeps its caches."""
+
+    if platform == "win":
+        cache_path = os.environ.get(
+            "LOCALAPPDATA", join(expanduser("~"), "AppData", "Local")
+        )
+    elif platform == "macosx":
+        cache_path = join(expanduser("~"), "Library", "Caches")
+    else:
+        cache_path = os.environ.get(
+            "XDG_CACHE_HOME", join(expanduser("~"), ".cache")
+        )
+    cache_path = join(cache_path, "kivymd_filemanager")
+    os.makedirs(cache_path, exist_ok=True)
+    return cache_path
+
+
+def get_mounts(options=False):
+    """
+    Returns a dictionary of mount points and their file system types, or
+    `(type, options)` tuples, where `options` is a set of the mount options,
+    if `options` is True. Only Linux is supported, on other platforms the
+    dictionary is empty.
+    """
+
+    mounts = {}
+    if platform not in ("linux", "android"):
+        return mounts
+    try:
+        with open("/proc/self/mounts", encoding="utf-8") as data:
+            for line in data:
+                fields = line.split()
+                if len(fields) < 4:
+                    continue
+                # Spaces and other special characters are escaped as octal.
+                mount_point = re.sub(
+                    r"\\([0-7]{3})",
+                    lambda match: chr(int(match.group(1), 8)),
+                    fields[1],
+                )
+                if options:
+                    mounts[mount_point] = (
+                        fields[2],
+                        frozenset(fields[3].split(",")),
+                    )
+                else:
+                    mounts[mount_point] = fields[2]
+    except OSError:
+        pass
+    return mounts
+
+
+def get_mount_point(path, mounts):
+    """
+    Returns the mount point from the `mounts` dictionary, see
+    :func:`get_mounts`, on which `path` is located or None.
+    """
+
+    path = os.path.abspath(path)
+    return max(
+        (
+            mount
+            for mount in mounts
+            if path == mount or path.startswith(mount.rstrip(sep) + sep)
+        ),
+        key=len,
+        default=None,
+    )
+
+
+def get_filesystem_type(path, mounts=None):
+    """Returns the type of the file system on which `path` is located."""
+
+    if mounts is None:
+        mounts = get_mounts()
+    return mounts.get(get_mount_point(path, mounts), "")
+
+
 def get_drives():
     drives = []
     if platform == "win":
@@ -0,0 +1,154 @@
+"""
+Flattened model of a tree of directories.
+
+The visible nodes of the tree are kept as a flat list of rows, in the order
+in which they are shown, so the tree can be displayed by a
+:class:`~kivy.uix.recycleview.RecycleView` that creates widgets only for the
+rows on screen. The model keeps only the names of the children of the read
+directories and the set of expanded paths:
+
+.. code-block:: python
+
+    model = TreeModel("/home/user")
+    model.set_children("/home/user", ["Documents", "Music"])
+    model.expand("/home/user/Documents")  # (2, 3, [...]) change of the rows
+    model.set_children("/home/user/Documents", ["Reports"])
+
+Every change of the model returns a `(start, stop, rows)` tuple, the rows
+from `start` to `stop` are replaced by `rows`, which can be applied to the
+data of a view with `data[start:stop] = rows`.
+"""
+
+import os
+
+
+class TreeModel:
+    """
+    Model of the tree of the directories in `root`.
+
+    :param root: the path to the root directory, which is not shown.
+    :param pardir: the name of a row of the parent directory that is shown
+                   before the directories, or None.
+    """
+
+    def __init__(self, root="", pardir=None):
+        self.root = root
+        self.pardir = pardir
+        # Paths to the expanded directories, they stay expanded when their
+        # parents are collapsed and expanded again.
+        self.expanded = set()
+        # Sorted names of the subdirectories by the paths to the read
+        # directories.
+        self._children = {}
+        self.rows = []
+        self._build()
+
+    def set_root(self, root, pardir=None):
+        """Shows the tree of the `root` directory. Returns a change."""
+
+        self.root = root
+        self.pardir = pardir
+        self.expanded.clear()
+        self._children.clear()
+        return self._build()
+
+    def get_children(self, path):
+        """Returns the names of the subdirectories of `path` or None."""
+
+        return self._children.get(path)
+
+    def get_read_directories(self):
+        """Returns the paths to the directories whose children are set."""
+
+        return list(self._children)
+
+    def set_children(self, path, names):
+        """
+        Sets the sorted `names` of the subdirectories of `path`. Returns a
+        change or None if the rows do not change.
+        """
+
+        names = list(names)
+        if self._children.get(path) == names:
+            return None
+        self._children[path] = names
+        if path == self.root:
+            return self._build()
+        return self._update(path)
+
+    def expand(self, path):
+        """Returns a change or None if `path` is not shown."""
+
+        self.expanded.add(path)
+        return self._update(path)
+
+    def collapse(self, path):
+        """Returns a change or None if `path` is not shown."""
+
+        self.expanded.discard(path)
+        return self._update(path)
+
+    def is_expanded(self, path):
+        return path in self.expanded
+
+    def index(self, path):
+        """Returns the index of the row of `path` or None."""
+
+        for index, row in enumerate(self.rows):
+            if row["path"] == path:
+                return index
+        return None
+
+    def get_shown_directories(self):
+        """
+        Returns the paths to the root and the expanded directories whose
+        children are shown.
+        """
+
+        return [self.root] + [
+            row["path"] for row in self.rows if row["is_open"]
+        ]
+
+    def _build(self):
+        stop = len(self.rows)
+        rows = []
+        if self.pardir is not None:
+            rows.append(self._create_row(self.pardir, self.pardir, 0, True))
+        rows.extend(self._get_subtree(self.root, 0))
+        self.rows = rows
+        return 0, stop, rows
+
+    def _update(self, path):
+        # Replaces the row of `path` and the rows of its subtree.
+        start = self.index(path)
+        if start is None:
+            return None
+        depth = self.rows[start]["depth"]
+        stop = start + 1
+        while stop < len(self.rows) and self.rows[stop]["depth"] > depth:
+            stop += 1
+        rows = [self._create_row(path, self.rows[start]["name"], depth)]
+        if rows[0]["is_open"]:
+            rows.extend(self._get_subtree(path, depth + 1))
+        self.rows[start:stop] = rows
+        return start, stop, rows
+
+    def _get_subtree(self, path, depth):
+        for name in self._children.get(path, ()):
+            child = os.path.join(path, name)
+            row = self._create_row(child, name, depth)
+            yield row
+            if row["is_open"]:
+                yield from self._get_subtree(child, depth + 1)
+
+    def _create_row(self, path, name, depth, is_leaf=None):
+        if is_leaf is None:
+            # Directories that are not read yet may have subdirectories.
+            is_leaf = self._children.get(path) == []
+        return {
+            "path": path,
+            "name": name,
+            "depth": depth,
+            "is_leaf": is_leaf,
+            "is_open": path in self.expanded and not is_leaf,
+        }
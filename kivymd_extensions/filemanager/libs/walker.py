@@ -0,0 +1,405 @@
+"""
+Parallel directory tree walker based on :func:`os.scandir`.
+
+Directories are read on a pool of threads sized for the storage on which the
+walk starts, and the matching files are streamed out as they are found:
+
+.. code-block:: python
+
+    walker = TreeWalker("/", match=lambda name: name.endswith(".py"))
+    for directory, names in walker.walk():
+        print(directory, names)
+"""
+
+import fnmatch
+import os
+import queue
+import re
+import threading
+
+from kivymd_extensions.filemanager.libs.tools import (
+    get_filesystem_type,
+    get_mounts,
+)
+
+NETWORK_FILESYSTEMS = (
+    "nfs",
+    "nfs4",
+    "cifs",
+    "smb3",
+    "smbfs",
+    "9p",
+    "afs",
+    "ceph",
+    "glusterfs",
+    "davfs",
+    "fuse.sshfs",
+    "fuse.rclone",
+)
+
+PSEUDO_FILESYSTEMS = (
+    "proc",
+    "sysfs",
+    "devtmpfs",
+    "devpts",
+    "cgroup",
+    "cgroup2",
+    "securityfs",
+    "debugfs",
+    "tracefs",
+    "pstore",
+    "bpf",
+    "configfs",
+    "fusectl",
+    "mqueue",
+    "hugetlbfs",
+    "binfmt_misc",
+    "autofs",
+    "efivarfs",
+    "selinuxfs",
+    "rpc_pipefs",
+    "nsfs",
+)
+
+# Names of the files with `.gitignore`-style patterns.
+IGNORE_FILES = (".gitignore", ".ignore")
+
+# Marks the end of the walk in the queue of results.
+_DONE = object()
+
+
+def is_rotational(path):
+    """
+    Returns True if `path` is on a rotational disk, False if it is on a solid
+    state drive and None if it is not known.
+    """
+
+    try:
+        st_dev = os.stat(path).st_dev
+        device = os.path.realpath(
+            f"/sys/dev/block/{os.major(st_dev)}:{os.minor(st_dev)}"
+        )
+    except (OSError, AttributeError):
+        return None
+    # Partitions do not have a queue, it belongs to the parent disk.
+    for directory in (device, os.path.dirname(device)):
+        try:
+            with open(os.path.join(directory, "queue", "rotational")) as data:
+                return data.read().strip() == "1"
+        except OSError:
+            continue
+    return None
+
+
+def get_io_workers(path):
+    """Returns the number of threads to read the directories of `path`."""
+
+    cpu_count = os.cpu_count() or 1
+    if get_filesystem_type(path) in NETWORK_FILESYSTEMS:
+        # Network round trips are hidden by many requests in flight.
+        return 32
+    rotational = is_rotational(path)
+    if rotational:
+        # Parallel reads only make the heads seek.
+        return 2
+    if rotational is False:
+        return min(32, cpu_count * 4)
+    return min(8, cpu_count + 4)
+
+
+def read_ignore_file(directory):
+    """
+    Returns a list of `(directory, regex, dir_only, negate)` rules read from
+    the `.gitignore`-style files in the `directory` directory.
+    """
+
+    rules = []
+    for name_file in IGNORE_FILES:
+        try:
+            with open(
+                os.path.join(directory, name_file), encoding="utf-8"
+            ) as data:
+                lines = data.read().splitlines()
+        except (OSError, UnicodeDecodeError):
+            continue
+        for line in lines:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            negate = line.startswith("!")
+            if negate:
+                line = line[1:]
+            dir_only = line.endswith("/")
+            line = line.rstrip("/")
+            anchored = "/" in line
+            line = line.lstrip("/")
+            if not line:
+                continue
+            regex = fnmatch.translate(line)
+            # Patterns without a slash match the name at any level.
+            if not anchored:
+                regex = f"(?:.*/)?{regex}"
+            regex = re.compile(regex)
+            rules.append((directory, regex, dir_only, negate))
+    return rules
+
+
+class PruneRules:
+    """
+    Rules that exclude parts of the tree from a walk.
+
+    :param one_filesystem: do not descend into directories on other devices.
+    :param skip_pseudo_filesystems: do not descend into the mount points of
+                                    virtual file systems like `/proc`.
+    :param exclude: a list of glob patterns of names (or paths if the pattern
+                    contains a separator) to skip.
+    :param max_depth: the maximum depth of the directories to read,
+                      the root has depth 0. None means no limit.
+    :param use_ignore_files: skip paths matching the patterns of the
+                             `.gitignore` and `.ignore` files in the tree.
+    """
+
+    def __init__(
+        self,
+        one_filesystem=False,
+        skip_pseudo_filesystems=False,
+        exclude=(),
+        max_depth=None,
+        use_ignore_files=False,
+    ):
+        self.one_filesystem = one_filesystem
+        self.skip_pseudo_filesystems = skip_pseudo_filesystems
+        self.max_depth = max_depth
+        self.use_ignore_files = use_ignore_files
+        self.exclude = tuple(exclude)
+        self._exclude_names = self._compile(
+            [pattern for pattern in exclude if os.sep not in pattern]
+        )
+        self._exclude_paths = self._compile(
+            [pattern for pattern in exclude if os.sep in pattern]
+        )
+        self._root_device = None
+        self._pseudo_mount_points = set()
+
+    def prepare(self, root):
+        """Collects the information about the `root` directory of a walk."""
+
+        if self.one_filesystem:
+            try:
+                self._root_device = os.stat(root).st_dev
+            except OSError:
+                self._root_device = None
+        if self.skip_pseudo_filesystems:
+            self._pseudo_mount_points = {
+                mount_point
+                for mount_point, filesystem_type in get_mounts().items()
+                if filesystem_type in PSEUDO_FILESYSTEMS
+                and mount_point != os.path.abspath(root)
+            }
+        return self
+
+    def get_key(self):
+        """Returns a string that is the same for the rules with same options."""
+
+        return repr(
+            (
+                bool(self.one_filesystem),
+                bool(self.skip_pseudo_filesystems),
+                sorted(self.exclude),
+                self.max_depth,
+                bool(self.use_ignore_files),
+            )
+        )
+
+    def skip_directory(self, entry, depth, ignore_rules=()):
+        """
+        Returns True if the `entry` directory at `depth` should not be read.
+        """
+
+        if self.max_depth is not None and depth > self.max_depth:
+            return True
+        if entry.path in self._pseudo_mount_points:
+            return True
+        if self._is_excluded(entry.name, entry.path):
+            return True
+        if ignore_rules and self._is_ignored(entry.path, True, ignore_rules):
+            return True
+        if self._root_device is not None:
+            try:
+                if (
+                    entry.stat(follow_symlinks=False).st_dev
+                    != self._root_device
+                ):
+                    return True
+            except OSError:
+                return True
+        return False
+
+    def skip_file(self, entry, ignore_rules=()):
+        """Returns True if the `entry` file should not be reported."""
+
+        if self._is_excluded(entry.name, entry.path):
+            return True
+        return bool(
+            ignore_rules and self._is_ignored(entry.path, False, ignore_rules)
+        )
+
+    def get_ignore_rules(self, directory, inherited_rules=()):
+        """
+        Returns the ignore rules for the `directory` directory: the rules of
+        its parents followed by the rules of its own ignore files.
+        """
+
+        if not self.use_ignore_files:
+            return inherited_rules
+        rules = read_ignore_file(directory)
+        return inherited_rules + tuple(rules) if rules else inherited_rules
+
+    def _compile(self, patterns):
+        if not patterns:
+            return None
+        return re.compile(
+            "|".join(fnmatch.translate(pattern) for pattern in patterns)
+        )
+
+    def _is_excluded(self, name, path):
+        return bool(
+            (self._exclude_names and self._exclude_names.match(name))
+            or (self._exclude_paths and self._exclude_paths.match(path))
+        )
+
+    def _is_ignored(self, path, is_dir, ignore_rules):
+        # As in git, the last matching pattern decides.
+        ignored = False
+        for directory, regex, dir_only, negate in ignore_rules:
+            if dir_only and not is_dir:
+                continue
+            relative_path = path[len(directory) :].lstrip(os.sep)
+            if os.sep != "/":
+                relative_path = relative_path.replace(os.sep, "/")
+            if regex.match(relative_path):
+                ignored = not negate
+        return ignored
+
+
+class TreeWalker:
+    """
+    Walks a directory tree reading the directories on a pool of threads.
+
+    :param root: the directory to walk.
+    :param match: a callable that takes a file name and returns True if the
+                  file should be reported. All files are reported by default.
+    :param workers: number of threads, see :func:`get_io_workers`.
+    :param on_directory: a callable that is called from the walker threads
+                         with the path to every directory that is read.
+    :param rules: a :class:`PruneRules` object.
+    :param depth: the depth of `root` for the `max_depth` rule, when the walk
+                  continues a walk of a parent directory.
+    :param ignore_rules: the ignore rules of the parents of `root`, when the
+                         walk continues a walk of a parent directory, see
+                         :meth:`PruneRules.get_ignore_rules`.
+    """
+
+    def __init__(
+        self,
+        root,
+        match=None,
+        workers=None,
+        on_directory=None,
+        rules=None,
+        depth=0,
+        ignore_rules=(),
+    ):
+        self.root = root
+        self.depth = depth
+        self.ignore_rules = ignore_rules
+        self.match = match
+        self.workers = workers or get_io_workers(root)
+        self.on_directory = on_directory
+        self.rules = rules.prepare(root) if rules else None
+        self._directories = queue.Queue()
+        self._results = queue.Queue()
+        self._finished = threading.Event()
+        self._canceled = threading.Event()
+
+    def walk(self):
+        """
+        Generator of `(directory, names)` tuples for every directory that
+        contains matching files. The order of the directories is undefined.
+        """
+
+        self._directories.put((self.root, self.depth, self.ignore_rules))
+        threads = [
+            threading.Thread(target=self._work, daemon=True)
+            for i in range(self.workers)
+        ]
+        threads.append(threading.Thread(target=self._wait, daemon=True))
+        for thread in threads:
+            thread.start()
+        try:
+            while True:
+                result = self._results.get()
+                if result is _DONE:
+                    break
+                yield result
+        finally:
+            self.cancel()
+
+    def cancel(self):
+        """Stops the walk. Directories that are being read are dropped."""
+
+        self._canceled.set()
+
+    def _wait(self):
+        self._directories.join()
+        self._finished.set()
+        self._results.put(_DONE)
+
+    def _work(self):
+        while True:
+            try:
+                item = self._directories.get(timeout=0.05)
+            except queue.Empty:
+                if self._finished.is_set():
+                    return
+                continue
+            try:
+                if not self._canceled.is_set():
+                    self._scan(*item)
+            finally:
+                self._directories.task_done()
+
+    def _scan(self, directory, depth, ignore_rules):
+        match = self.match
+        rules = self.rules
+        names = []
+        if self.on_directory:
+            self.on_directory(directory)
+        if rules:
+            ignore_rules = rules.get_ignore_rules(directory, ignore_rules)
+        try:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    try:
+                        # Like os.walk, links to directories are not files,
+                        # but they are not followed either.
+                        if entry.is_dir():
+                            if not entry.is_symlink() and not (
+                                rules
+                                and rules.skip_directory(
+                                    entry, depth + 1, ignore_rules
+                                )
+                            ):
+                                self._directories.put(
+                                    (entry.path, depth + 1, ignore_rules)
+                                )
+                        elif rules and rules.skip_file(entry, ignore_rules):
+                            continue
+                        elif match is None or match(entry.name):
+                            names.append(entry.name)
+                    except OSError:
+                        continue
+        except OSError:
+            return
+        if names:
+            self._results.put((directory, names))
@@ -0,0 +1,351 @@
+"""
+Notifications of changes in directories.
+
+On Linux (and Android) the changes are reported by inotify, which is used
+through :mod:`ctypes`. On other systems, or when inotify is not available,
+the modification times of the watched directories are polled.
+
+The changes are batched and delivered on the main thread, every subscriber
+is called at most once per batch for a directory. A watched directory that
+is removed stays watched, and its subscribers are called again when it is
+created anew:
+
+.. code-block:: python
+
+    watcher = FileWatcher()
+    watcher.watch("/home/user", lambda path: print("Changed", path))
+    watcher.bind(on_change=lambda watcher, paths: print(paths))
+    ...
+    watcher.stop()
+"""
+
+import ctypes
+import ctypes.util
+import errno
+import os
+import select
+import struct
+import sys
+import threading
+
+from kivy.clock import Clock
+from kivy.event import EventDispatcher
+from kivy.logger import Logger
+from kivy.properties import NumericProperty
+
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+
+WATCH_MASK = (
+    IN_ATTRIB
+    | IN_CLOSE_WRITE
+    | IN_MOVED_FROM
+    | IN_MOVED_TO
+    | IN_CREATE
+    | IN_DELETE
+    | IN_DELETE_SELF
+    | IN_MOVE_SELF
+    | IN_ONLYDIR
+)
+
+# struct inotify_event without the name: wd, mask, cookie, len.
+_EVENT_HEADER = struct.Struct("iIII")
+
+
+class InotifyBackend:
+    """
+    Watches directories with inotify.
+
+    :param on_change: a callable that is called from the thread of the
+                      backend with the path to a changed directory.
+    :param on_lost: a callable that is called from the thread of the backend
+                    with the path to a directory that is no longer watched,
+                    because it was removed or unmounted.
+    :raises OSError: if inotify is not available.
+    """
+
+    def __init__(self, on_change, on_lost=None):
+        if not sys.platform.startswith("linux"):
+            raise OSError(errno.ENOSYS, "inotify is only available on Linux")
+        self.on_change = on_change
+        self.on_lost = on_lost
+        self._libc = ctypes.CDLL(
+            ctypes.util.find_library("c") or "libc.so.6", use_errno=True
+        )
+        self._fd = self._libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self._fd < 0:
+            error = ctypes.get_errno()
+            raise OSError(error, os.strerror(error))
+        # Wakes the thread up when the backend is stopped.
+        self._wake_read, self._wake_write = os.pipe()
+        # Sets of paths by watch descriptor. Paths to the same directory,
+        # through links, share the descriptor.
+        self._paths = {}
+        # Watch descriptors by path.
+        self._descriptors = {}
+        self._lock = threading.Lock()
+        threading.Thread(target=self._read_events, daemon=True).start()
+
+    def add(self, path):
+        """Returns False if the directory cannot be watched."""
+
+        descriptor = self._libc.inotify_add_watch(
+            self._fd, os.fsencode(path), WATCH_MASK
+        )
+        if descriptor < 0:
+            return False
+        with self._lock:
+            self._paths.setdefault(descriptor, set()).add(path)
+            self._descriptors[path] = descriptor
+        return True
+
+    def remove(self, path):
+        with self._lock:
+            descriptor = self._descriptors.pop(path, None)
+            paths = self._paths.get(descriptor)
+            if paths is None:
+                return
+            paths.discard(path)
+            if paths:
+                # Other paths still watch the directory.
+                return
+            del self._paths[descriptor]
+        self._libc.inotify_rm_watch(self._fd, descriptor)
+
+    def stop(self):
+        os.write(self._wake_write, b"\0")
+
+    def _read_events(self):
+        try:
+            while True:
+                ready = select.select([self._fd, self._wake_read], [], [])[0]
+                if self._wake_read in ready:
+                    break
+                try:
+                    data = os.read(self._fd, 64 * 1024)
+                except BlockingIOError:
+                    continue
+                self._parse_events(data)
+        except OSError:
+            Logger.exception("FileWatcher: error reading inotify events")
+        finally:
+            os.close(self._fd)
+            os.close(self._wake_read)
+            os.close(self._wake_write)
+
+    def _parse_events(self, data):
+        offset = 0
+        changed = set()
+        lost = set()
+        with self._lock:
+            while offset < len(data):
+                descriptor, mask, cookie, length = _EVENT_HEADER.unpack_from(
+                    data, offset
+                )
+                offset += _EVENT_HEADER.size + length
+                if mask & IN_Q_OVERFLOW:
+                    # Events were lost, everything may have changed.
+                    changed.update(self._descriptors)
+                    continue
+                paths = self._paths.get(descriptor)
+                if paths is None:
+                    continue
+                changed.update(paths)
+                if mask & IN_IGNORED:
+                    # The directory was removed or unmounted.
+                    del self._paths[descriptor]
+                    for path in paths:
+                        self._descriptors.pop(path, None)
+                    lost.update(paths)
+        for path in changed:
+            self.on_change(path)
+        if self.on_lost:
+            for path in lost:
+                self.on_lost(path)
+
+
+class PollingBackend:
+    """
+    Watches directories by polling their modification times every
+    `interval` seconds.
+    """
+
+    def __init__(self, on_change, interval=2):
+        self.on_change = on_change
+        self.interval = interval
+        self._mtimes = {}
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        threading.Thread(target=self._poll, daemon=True).start()
+
+    def add(self, path):
+        with self._lock:
+            self._mtimes[path] = self._get_mtime(path)
+        return True
+
+    def remove(self, path):
+        with self._lock:
+            self._mtimes.pop(path, None)
+
+    def stop(self):
+        self._stopped.set()
+
+    def _get_mtime(self, path):
+        try:
+            return os.stat(path).st_mtime_ns
+        except OSError:
+            return None
+
+    def _poll(self):
+        while not self._stopped.wait(self.interval):
+            with self._lock:
+                paths = list(self._mtimes)
+            for path in paths:
+                mtime = self._get_mtime(path)
+                with self._lock:
+                    if path not in self._mtimes or self._mtimes[path] == mtime:
+                        continue
+                    self._mtimes[path] = mtime
+                self.on_change(path)
+
+
+class FileWatcher(EventDispatcher):
+    """
+    Delivers the changes in the watched directories to subscribers.
+
+    :Events:
+        `on_change`
+            Called with a set of paths to all changed directories.
+    """
+
+    delay = NumericProperty(0.2)
+    """
+    Time in seconds during which the changes are collected into one batch.
+
+    :attr:`delay` is an :class:`~kivy.properties.NumericProperty`
+    and defaults to `0.2`.
+    """
+
+    __events__ = ("on_change",)
+
+    def __init__(self, **kwargs):
+        handlers = {
+            name: kwargs.pop(name) for name in self.__events__ if name in kwargs
+        }
+        super().__init__(**kwargs)
+        self.bind(**handlers)
+        # Callbacks by the paths to watched directories.
+        self._subscribers = {}
+        self._changed = set()
+        # Directories that the backend no longer watches.
+        self._lost = set()
+        self._lock = threading.Lock()
+        self._backend = None
+        # Directories that the inotify backend cannot watch, for example
+        # when the limit of watches is reached or the directory does not
+        # exist, are polled.
+        self._fallback = None
+        # Paths polled by the fallback instead of the inotify backend.
+        self._polled = set()
+        self._trigger_flush = Clock.create_trigger(self._flush, self.delay)
+
+    def watch(self, path, callback):
+        """
+        Calls `callback(path)` on the main thread when the contents of the
+        `path` directory change.
+        """
+
+        path = os.path.abspath(path)
+        callbacks = self._subscribers.setdefault(path, [])
+        if not callbacks:
+            if self._backend is None:
+                try:
+                    self._backend = InotifyBackend(
+                        self._on_backend_change, self._on_backend_lost
+                    )
+                except (OSError, AttributeError):
+                    self._backend = self._get_fallback()
+            self._add(path)
+        callbacks.append(callback)
+
+    def unwatch(self, path, callback):
+        path = os.path.abspath(path)
+        callbacks = self._subscribers.get(path, [])
+        if callback in callbacks:
+            callbacks.remove(callback)
+        if not callbacks and path in self._subscribers:
+            del self._subscribers[path]
+            self._polled.discard(path)
+            for backend in {self._backend, self._fallback}:
+                if backend:
+                    backend.remove(path)
+
+    def stop(self):
+        """Stops watching all directories."""
+
+        for backend in {self._backend, self._fallback}:
+            if backend:
+                backend.stop()
+        self._backend = None
+        self._fallback = None
+        self._subscribers.clear()
+        self._polled.clear()
+        with self._lock:
+            self._changed.clear()
+            self._lost.clear()
+
+    def on_change(self, paths):
+        pass
+
+    def _add(self, path):
+        if self._backend.add(path):
+            return
+        self._get_fallback().add(path)
+        if self._backend is not self._fallback:
+            self._polled.add(path)
+
+    def _get_fallback(self):
+        if self._fallback is None:
+            self._fallback = PollingBackend(self._on_backend_change)
+        return self._fallback
+
+    def _on_backend_change(self, path):
+        with self._lock:
+            self._changed.add(path)
+        self._trigger_flush()
+
+    def _on_backend_lost(self, path):
+        with self._lock:
+            self._lost.add(path)
+        self._trigger_flush()
+
+    def _flush(self, *args):
+        with self._lock:
+            changed, self._changed = self._changed, set()
+            lost, self._lost = self._lost, set()
+        if not self._backend:
+            return
+        for path in lost:
+            # A removed directory is polled until it is created again.
+            if path in self._subscribers:
+                self._add(path)
+        for path in changed & self._polled:
+            # A directory created again is watched by inotify again.
+            if self._backend.add(path):
+                self._polled.discard(path)
+                self._fallback.remove(path)
+        if not changed:
+            return
+        self.dispatch("on_change", changed)
+        for path in changed:
+            for callback in list(self._subscribers.get(path, ())):
+                callback(path)
@@ -53,6 +53,7 @@ if __name__ == "__main__":
                 "sphinx-autoapi==1.4.0",
                 "sphinx_rtd_theme",
             ],
+            "thumbnails": ["pillow"],
         },
         install_requires=["kivymd>=0.104.1", "kivy>=1.11.1"],
         setup_requires=[],